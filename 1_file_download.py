@@ -1,6 +1,7 @@
-import yt_dlp
-import pandas as pd
 import os
+import pandas as pd
+
+from pipeline.download import Downloader, STATUS_DONE
 
 # Path to your Excel file (update with actual file name)
 excel_file = r"C:\Users\User\vinoth\myproject\urls.xlsx"
@@ -14,17 +15,36 @@ urls = df.iloc[:, 0].dropna().tolist()
 # Output folder
 output_folder = r"C:\Users\User\vinoth\myproject\downloads"
 
-# Loop through each URL and download
-for i, url in enumerate(urls, start=1):
-    outtmpl = os.path.join(output_folder, f"video_{i}.%(ext)s")
-
-    ydl_opts = {
-        "outtmpl": outtmpl,  # unique filename
-        "format": "mp4",  # best video+audio
-    }
-
-    print(f"Downloading {url} as video_{i}.mp4 ...")
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([url])
-
-print("All downloads complete!")
+# Manifest keeps URL -> file/size/checksum/status so reruns skip finished downloads
+manifest_file = os.path.join(output_folder, "manifest.json")
+
+# --- Download settings ---
+CONCURRENCY = 4   # parallel workers
+PER_HOST = 2      # max simultaneous downloads from one host
+RETRIES = 3       # retries per URL (backoff doubles each time)
+
+
+def report(url, entry):
+    if entry.get("status") == STATUS_DONE:
+        print(f"✅ {url} -> {os.path.basename(entry['file'])}")
+    else:
+        print(f"❌ {url} failed after {entry.get('attempts')} attempts: {entry.get('error')}")
+
+
+if __name__ == "__main__":
+    print(f"Downloading {len(urls)} URLs with {CONCURRENCY} workers ...")
+    downloader = Downloader(
+        output_folder,
+        manifest_file,
+        concurrency=CONCURRENCY,
+        per_host=PER_HOST,
+        retries=RETRIES,
+        ydl_opts={"format": "mp4"},  # best video+audio
+    )
+    results = downloader.run(urls, on_done=report)
+
+    failed = [url for url, entry in results.items() if entry.get("status") != STATUS_DONE]
+    if failed:
+        print(f"⚠️ {len(failed)} downloads failed; rerun to retry them.")
+    else:
+        print("All downloads complete!")
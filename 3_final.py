@@ -1,82 +1,90 @@
 import os
-import random
-from moviepy.editor import VideoFileClip, concatenate_videoclips, AudioFileClip, CompositeVideoClip
-from moviepy.audio.fx.all import audio_loop
+import time
+
+from pipeline.builds import BuildCache, natural_key, seeded_choice
+from pipeline.concat import assemble
+from pipeline.media_index import MediaIndex
 
 # --- Input / Output directories ---
 shorts_folder = r"C:\Users\User\vinoth\myproject\output"
 background_music_folder = r"C:\Users\User\vinoth\myproject\background"
 final_output = r"C:\Users\User\vinoth\myproject\final_long_video.mp4"
-
-# --- Collect all short videos ---
-short_files = [f for f in os.listdir(shorts_folder) if f.lower().endswith((".mp4", ".mov", ".avi", ".mkv"))]
-
-if not short_files:
-    print("⚠️ No short videos found in", shorts_folder)
-    exit()
-
-short_files.sort()  # keep consistent order
-
-# --- Load shorts and fit them into 1920x1080 with black bars ---
-clips = []
-for short in short_files:
-    path = os.path.join(shorts_folder, short)
-    print(f"📼 Adding: {short}")
-    clip = VideoFileClip(path).without_audio()
-
-    # Scale by height to fit into 1080
-    clip = clip.resize(height=1080)
-
-    # Create a black 1920x1080 background
-    background = VideoFileClip(path).without_audio().resize((1920, 1080)).set_opacity(0).on_color(
-        size=(1920, 1080), color=(0, 0, 0), pos=("center", "center")
+# Probe results of the shorts (duration, fps, size, codecs), refreshed incrementally
+media_index_file = r"C:\Users\User\vinoth\myproject\media_index.sqlite"
+
+# --- Assembly method ---
+# "auto" picks the cheapest valid path: "copy" (stream copy), "demux-pad"
+# (one encode via the concat demuxer) or, for shorts that differ, "parts"
+# (each short encoded on its own, parts joined by stream copy).
+# "filter" forces one ffmpeg filter graph over every short (all open at once);
+# "moviepy" forces Python compositing (streams one short at a time).
+ASSEMBLY_METHOD = "auto"
+# Encoder profile for paths that re-encode (see pipeline/encoders.py)
+ENCODER = "publish"
+# Re-encoding ffmpeg paths: encode this many runs of shorts at once and join them by
+# stream copy (None/1 = one ffmpeg for the whole video)
+ASSEMBLY_WORKERS = None
+# Skip the assembly when no short, the music or the settings changed since the last build
+INCREMENTAL = True
+
+if __name__ == "__main__":
+    # --- Collect all short videos ---
+    short_files = [f for f in os.listdir(shorts_folder) if f.lower().endswith((".mp4", ".mov", ".avi", ".mkv"))]
+
+    if not short_files:
+        print("⚠️ No short videos found in", shorts_folder)
+        exit()
+
+    short_files.sort(key=natural_key)  # keep consistent order (video_10 after video_9)
+
+    # --- Durations, sizes and codecs from the media index (one probe per new or changed short) ---
+    with MediaIndex(media_index_file) as index:
+        infos = index.infos([os.path.join(shorts_folder, short) for short in short_files])
+    for short, info in zip(short_files, infos):
+        if info is None:
+            print(f"⚠️ Skipping unreadable short: {short}")
+    short_files, infos = [s for s, i in zip(short_files, infos) if i], [i for i in infos if i]
+    if not short_files:
+        print("⚠️ No readable short videos found in", shorts_folder)
+        exit()
+    for short in short_files:
+        print(f"📼 Adding: {short}")
+
+    # --- Pick one background music (stable across runs for the same final video) ---
+    music_files = [f for f in os.listdir(background_music_folder) if f.lower().endswith((".mp3", ".wav", ".aac"))]
+
+    if not music_files:
+        print("⚠️ No music files found in", background_music_folder)
+        exit()
+
+    music_file = seeded_choice(sorted(music_files), "final", os.path.basename(final_output))
+    music_path = os.path.join(background_music_folder, music_file)
+    print(f"🎵 Using background music: {music_file}")
+
+    # --- Which shorts changed since the last build? ---
+    short_paths = [os.path.join(shorts_folder, short) for short in short_files]
+    cache = BuildCache(shorts_folder)
+    state = cache.shorts_state(short_paths)
+    final_key = cache.final_key(state, music_path, method=ASSEMBLY_METHOD, encoder=ENCODER)
+    if INCREMENTAL and cache.is_current(final_output, final_key):
+        print(f"⏭️ Final long video is up to date: {final_output}")
+        exit()
+    changed = cache.changed(final_output, state)
+    if len(changed) < len(state):
+        print(f"🔁 {len(changed)} of {len(state)} shorts changed since the last build: {', '.join(changed) or 'none'}")
+
+    # --- Export with high quality (1920x1080 for long video) ---
+    start = time.perf_counter()
+    used = assemble(
+        short_paths,
+        music_path,
+        final_output,
+        method=ASSEMBLY_METHOD,
+        encoder=ENCODER,
+        infos=infos,
+        workers=ASSEMBLY_WORKERS,
     )
+    print(f"⚙️ Assembly path: {used} ({time.perf_counter() - start:.1f}s)")
+    cache.record(final_output, final_key, shorts=state)
 
-    # Place the vertical clip centered over black background
-    clip = CompositeVideoClip([background, clip.set_position(("center", "center"))], size=(1920, 1080))
-
-    clips.append(clip)
-
-# Concatenate into one long video
-final_video = concatenate_videoclips(clips, method="compose")
-
-# --- Pick one random background music ---
-music_files = [f for f in os.listdir(background_music_folder) if f.lower().endswith((".mp3", ".wav", ".aac"))]
-
-if not music_files:
-    print("⚠️ No music files found in", background_music_folder)
-    exit()
-
-music_file = random.choice(music_files)
-music_path = os.path.join(background_music_folder, music_file)
-print(f"🎵 Using background music: {music_file}")
-
-# Load and adjust music
-music = AudioFileClip(music_path).volumex(0.5)
-
-# Loop music if it's shorter than video, or trim if longer
-if music.duration < final_video.duration:
-    music = audio_loop(music, duration=final_video.duration)
-else:
-    music = music.subclip(0, final_video.duration)
-
-# Add audio to final video
-final_video = final_video.set_audio(music)
-
-# --- Export with high quality (1920x1080 for long video) ---
-final_video.write_videofile(
-    final_output,
-    codec="libx264",
-    audio_codec="aac",
-    preset="medium",
-    ffmpeg_params=[
-        "-crf", "18",
-        "-pix_fmt", "yuv420p",
-        "-movflags", "+faststart",
-        "-b:a", "320k"
-    ],
-    fps=clips[0].fps,
-    threads=4
-)
-
-print(f"✅ Final long video saved at: {final_output}")
+    print(f"✅ Final long video saved at: {final_output}")
@@ -0,0 +1,3 @@
+"""
+Render benchmarks. Run from the project root, e.g. `python -m benchmarks.bench_fit_blur`.
+"""
@@ -0,0 +1,93 @@
+"""
+Fast layer compositor vs CompositeVideoClip on the real layouts.
+
+Builds each layout at full size on synthetic 1080p fixtures and renders the
+same frames through both compositors, once with the layers' frames
+preloaded (compositing only) and once live (whole layout). Prints frames
+per second, the speed-up and the largest pixel difference.
+
+    python -m benchmarks.bench_compositor [fixture folder]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from moviepy.editor import VideoClip, VideoFileClip
+
+from benchmarks.fixtures import make_fixtures
+from pipeline.compositor import Layer, compose, moviepy_composite
+from pipeline.layouts import LAYOUTS, layout_size
+from pipeline.render import make_job
+
+# --- Benchmark settings ---
+FIXTURES = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.gettempdir(), "bench_fixtures")
+RESOLUTION = "1080p"
+SECONDS = 4
+FRAMES = 60
+TOLERANCE = 1  # max abs difference per channel (rounding vs truncation)
+
+
+def preloaded(layer, times):
+    """
+    The same layer, replaying frames rendered up front, so only compositing is timed.
+    """
+    frames = [layer.clip.get_frame(t).copy() for t in times]
+    index = {t: i for i, t in enumerate(times)}
+    clip = VideoClip(lambda t: frames[index[t]], duration=layer.clip.duration)
+    alpha = None
+    if layer.alpha is not None:
+        alphas = [layer.alpha(t).copy() for t in times]
+        masks = [a / 255.0 for a in alphas]
+        clip = clip.set_mask(VideoClip(lambda t: masks[index[t]], ismask=True, duration=layer.clip.duration))
+        alpha = lambda t: alphas[index[t]]  # noqa: E731
+    return Layer(clip, layer.pos, alpha)
+
+
+def frames_per_second(clip, times):
+    start = time.perf_counter()
+    for t in times:
+        clip.get_frame(t)
+    return len(times) / (time.perf_counter() - start)
+
+
+def max_diff(a, b, times):
+    return max(
+        int(np.abs(a.get_frame(t).astype(np.int16) - b.get_frame(t).astype(np.int16)).max()) for t in times[::10]
+    )
+
+
+if __name__ == "__main__":
+    os.makedirs(FIXTURES, exist_ok=True)
+    fx = make_fixtures(FIXTURES, RESOLUTION, SECONDS)
+    source = VideoFileClip(fx["source"], audio=False)
+    times = [i / source.fps for i in range(min(FRAMES, int(source.duration * source.fps)))]
+    size = layout_size()
+    print(f"📏 {RESOLUTION} source -> {size[0]}x{size[1]}, {len(times)} frames")
+
+    worst = 0
+    for layout, (builder, _) in LAYOUTS.items():
+        reaction = fx["green"] if layout.startswith("keyed") else fx["reaction"]
+        video = builder(source, make_job(fx["source"], layout, reaction, fx["music"], None), size)
+
+        layers = [preloaded(layer, times) for layer in video.layers]
+        fast_fps = frames_per_second(compose(layers, size), times)
+        moviepy_fps = frames_per_second(moviepy_composite(layers, size), times)
+
+        live_fast_fps = frames_per_second(video, times)
+        reference = moviepy_composite(video.layers, size)
+        live_moviepy_fps = frames_per_second(reference, times)
+
+        diff = max_diff(video, reference, times)
+        worst = max(worst, diff)
+        print(
+            f"{layout}: compositing {moviepy_fps:.1f} -> {fast_fps:.1f} fps ({fast_fps / moviepy_fps:.2f}x), "
+            f"{1000 / moviepy_fps - 1000 / fast_fps:.1f} ms/frame saved; "
+            f"whole layout {live_moviepy_fps:.1f} -> {live_fast_fps:.1f} fps; max abs diff {diff}"
+        )
+
+    source.close()
+    if worst > TOLERANCE:
+        print(f"❌ Output differs from CompositeVideoClip by {worst} (> {TOLERANCE})")
+        sys.exit(1)
@@ -0,0 +1,58 @@
+import sys
+import time
+
+import cv2
+import numpy as np
+from moviepy.editor import VideoFileClip, CompositeVideoClip
+
+from pipeline.blur import make_fit_with_blur
+
+# --- Benchmark settings ---
+SOURCE = sys.argv[1] if len(sys.argv) > 1 else "Video.mp4"
+FRAMES = 120
+TARGETS = [(1080, 960), (1080, 1920)]
+
+
+def legacy_fit_with_blur(clip, target_w, target_h):
+    """
+    The original two-chain MoviePy composition, kept here as the reference.
+    """
+    if clip.w / clip.h > target_w / target_h:
+        fg = clip.resize(width=target_w)
+    else:
+        fg = clip.resize(height=target_h)
+
+    def blur_frame(frame):
+        return cv2.GaussianBlur(frame, (55, 55), 0)
+
+    bg = clip.resize((target_w, target_h)).fl_image(blur_frame).volumex(0)
+    fg = fg.set_position("center")
+    return CompositeVideoClip([bg, fg], size=(target_w, target_h))
+
+
+def frames_per_second(clip, times):
+    start = time.perf_counter()
+    for t in times:
+        clip.get_frame(t)
+    return len(times) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    source = VideoFileClip(SOURCE, audio=False)
+    times = [i / source.fps for i in range(min(FRAMES, int(source.duration * source.fps)))]
+    print(f"📏 {SOURCE}: {source.w}x{source.h}, {len(times)} frames")
+
+    for target_w, target_h in TARGETS:
+        legacy = legacy_fit_with_blur(source, target_w, target_h)
+        fused = make_fit_with_blur(source, target_w, target_h)
+
+        legacy_fps = frames_per_second(legacy, times)
+        fused_fps = frames_per_second(fused, times)
+
+        diff = np.abs(legacy.get_frame(times[-1]).astype(np.int16) - fused.get_frame(times[-1]).astype(np.int16))
+        print(
+            f"{target_w}x{target_h}: legacy {legacy_fps:.1f} fps, fused {fused_fps:.1f} fps "
+            f"({fused_fps / legacy_fps:.2f}x), mean abs diff {diff.mean():.2f}"
+        )
+
+    source.close()
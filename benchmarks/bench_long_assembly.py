@@ -0,0 +1,89 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import psutil
+
+from benchmarks.monitor import Monitor, handle_count
+from pipeline.concat import assemble
+from pipeline.ffmpeg import probe, run_ffmpeg
+
+# --- Benchmark settings ---
+SHORTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+SHORT_SECONDS = 0.5
+# Vertical like the real shorts, in mixed sizes and frame rates so that
+# "auto" takes the path used for shorts that can't be joined as they are
+VARIANTS = [("testsrc", "108x192", 10), ("testsrc2", "120x212", 10),
+            ("smptebars", "108x192", 15), ("rgbtestsrc", "120x212", 15)]
+
+# Limits for a flat run. RSS includes the ffmpeg encoder, whose size does not
+# depend on the number of shorts, so growth is judged between the first and
+# second half of the render rather than against the idle baseline. Child
+# handles are summed over all ffmpegs, so a path that opens every short at
+# once fails here.
+MAX_EXTRA_HANDLES = 32
+MAX_CHILD_HANDLES = 64
+MAX_CHILDREN = 4
+MAX_RSS_GROWTH_MB = 64
+
+
+def make_fixtures(folder, count):
+    """
+    A few distinct synthetic shorts copied `count` times, plus a music track.
+    """
+    variants = []
+    for i, (pattern, size, rate) in enumerate(VARIANTS):
+        path = os.path.join(folder, f"variant_{i}.mp4")
+        run_ffmpeg(["-f", "lavfi", "-i", f"{pattern}=size={size}:rate={rate}:d={SHORT_SECONDS}",
+                    "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path])
+        variants.append(path)
+
+    shorts = []
+    for i in range(count):
+        path = os.path.join(folder, f"short_{i:04d}.mp4")
+        shutil.copyfile(variants[i % len(variants)], path)
+        shorts.append(path)
+
+    music = os.path.join(folder, "music.wav")
+    run_ffmpeg(["-f", "lavfi", "-i", "sine=frequency=440:duration=7", music])
+    return shorts, music
+
+
+if __name__ == "__main__":
+    folder = tempfile.mkdtemp(prefix="long_assembly_")
+    try:
+        shorts, music = make_fixtures(folder, SHORTS)
+        # Probed like 3_final.py does, so "auto" sees the real stream params
+        variant_infos = [probe(path) for path in shorts[:len(VARIANTS)]]
+        infos = [variant_infos[i % len(VARIANTS)] for i in range(len(shorts))]
+
+        proc = psutil.Process()
+        base_rss = proc.memory_info().rss
+        base_handles = handle_count(proc)
+
+        monitor = Monitor()
+        monitor.start()
+        start = time.perf_counter()
+        path = assemble(shorts, music, os.path.join(folder, "long.mp4"), method="auto", infos=infos)
+        wall = time.perf_counter() - start
+        monitor.finish()
+
+        half = len(monitor.samples) // 2
+        first_peak = max(monitor.samples[:half] or [base_rss])
+        second_peak = max(monitor.samples[half:] or [base_rss])
+        growth_mb = (second_peak - first_peak) / 1024 / 1024
+        extra_handles = monitor.peak_handles - base_handles
+        print(f"📼 {len(shorts)} shorts assembled in {wall:.1f}s via \"{path}\"")
+        print(f"  peak RSS {second_peak / 1024 / 1024:.0f} MB (incl. ffmpeg), "
+              f"growth first -> second half {growth_mb:+.0f} MB")
+        print(f"  peak extra handles {extra_handles}, peak child handles {monitor.peak_child_handles}, "
+              f"peak child processes {monitor.peak_children}")
+
+        ok = (extra_handles <= MAX_EXTRA_HANDLES and monitor.peak_child_handles <= MAX_CHILD_HANDLES
+              and monitor.peak_children <= MAX_CHILDREN and growth_mb <= MAX_RSS_GROWTH_MB)
+        print("✅ memory and handles stayed flat" if ok else "❌ resource use grew with the number of shorts")
+        sys.exit(0 if ok else 1)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
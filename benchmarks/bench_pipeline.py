@@ -0,0 +1,129 @@
+"""
+Streaming pipeline end to end on synthetic clips served over local HTTP.
+
+Serves copies of a synthetic source clip from a local file server,
+downloads them through the real Downloader (yt-dlp), renders the shorts
+and builds the long video with StreamingPipeline. Prints the wall time
+against the stage spans, checks every short and the long video (its
+duration is the shorts' total), then reruns to check nothing is redone.
+The URL list repeats one URL, which must not stall the run.
+Exits 1 if a check fails.
+
+    python -m benchmarks.bench_pipeline [videos] [disk budget MB]
+"""
+import functools
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fixtures import make_fixtures
+from pipeline.builds import BuildCache
+from pipeline.download import STATUS_DONE, Downloader
+from pipeline.ffmpeg import probe
+from pipeline.stream import StreamingPipeline
+
+# --- Benchmark settings ---
+VIDEOS = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+DISK_BUDGET_MB = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0  # small, so downloads hit backpressure
+RESOLUTION = "480p"
+SECONDS = 4
+LAYOUTS = ["split", "corner"]
+DURATION_TOLERANCE = 0.2  # seconds, long video vs the sum of the shorts
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # clients hanging up mid-file (yt-dlp sniffing the format) are expected
+
+
+def serve(folder):
+    """
+    Starts a local file server for `folder`; returns it and its base URL.
+    """
+    server = QuietServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=folder))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run(root, urls):
+    output_folder = os.path.join(root, "output")
+    downloader = Downloader(os.path.join(root, "downloads"), os.path.join(root, "manifest.json"), retries=1,
+                            backoff=0.1)
+    pipeline = StreamingPipeline(
+        downloader,
+        os.path.join(root, "reaction"),
+        os.path.join(root, "background"),
+        output_folder,
+        os.path.join(root, "final_long_video.mp4"),
+        LAYOUTS,
+        encoder="draft",
+        final_encoder="draft",
+        disk_budget_mb=DISK_BUDGET_MB,
+        cache=BuildCache(output_folder),
+    )
+    return pipeline.run(urls)
+
+
+def check(root, report, videos):
+    failures = []
+    failed = [url for url, entry in report["downloads"].items() if entry.get("status") != STATUS_DONE]
+    failed += [r["name"] for r in report["renders"] if not r["ok"]]
+    if failed:
+        failures.append(f"failed: {failed}")
+    shorts = [os.path.join(root, "output", f) for f in os.listdir(os.path.join(root, "output")) if f.endswith(".mp4")]
+    if len(shorts) != videos * len(LAYOUTS):
+        failures.append(f"{len(shorts)} shorts, expected {videos * len(LAYOUTS)}")
+    final = os.path.join(root, "final_long_video.mp4")
+    if not os.path.exists(final):
+        return failures + ["no long video"]
+    expected = sum(probe(s)["duration"] for s in shorts)
+    actual = probe(final)["duration"]
+    if abs(actual - expected) > DURATION_TOLERANCE:
+        failures.append(f"long video is {actual:.2f}s, shorts total {expected:.2f}s")
+    return failures
+
+
+if __name__ == "__main__":
+    root = tempfile.mkdtemp(prefix="bench_pipeline_")
+    server = None
+    try:
+        served = os.path.join(root, "served")
+        for folder in ("fixtures", "served", "reaction", "background"):
+            os.makedirs(os.path.join(root, folder))
+        fx = make_fixtures(os.path.join(root, "fixtures"), RESOLUTION, SECONDS)
+        for i in range(1, VIDEOS + 1):
+            shutil.copyfile(fx["source"], os.path.join(served, f"clip_{i}.mp4"))
+        shutil.copyfile(fx["reaction"], os.path.join(root, "reaction", "reaction.mp4"))
+        shutil.copyfile(fx["music"], os.path.join(root, "background", "music.wav"))
+        server, base = serve(served)
+        urls = [f"{base}/clip_{i}.mp4" for i in range(1, VIDEOS + 1)]
+        urls.append(urls[0])  # a repeated row in the sheet is fetched and rendered once
+
+        report = run(root, urls)
+        stages = report["stages"]
+        print(f"⏱️ {VIDEOS} videos: wall {report['wall']:.1f}s vs {sum(stages.values()):.1f}s of stage spans "
+              f"({', '.join(f'{name} {seconds:.1f}s' for name, seconds in stages.items())}); "
+              f"peak disk {report['peak_disk'] / 2**20:.1f} MB, {report['budget_waits']} budget waits")
+        failures = check(root, report, VIDEOS)
+
+        rerun = run(root, urls)
+        if rerun["renders"] or rerun["parts_encoded"]:
+            failures.append(f"rerun redid {len(rerun['renders'])} renders, {rerun['parts_encoded']} parts")
+        print(f"🔁 Rerun: {rerun['wall']:.1f}s")
+    finally:
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+    if failures:
+        print("❌ " + "; ".join(failures))
+        sys.exit(1)
+    print("✅ Streaming pipeline output checks passed")
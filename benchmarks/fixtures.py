@@ -0,0 +1,52 @@
+import os
+
+from pipeline.ffmpeg import run_ffmpeg
+
+# --- Synthetic fixture formats ---
+# Name -> landscape source size; reactions are portrait at the same height
+RESOLUTIONS = {
+    "480p": (854, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+FPS = 30
+MUSIC_FRACTION = 0.6  # music shorter than the video, so the loop path is exercised
+
+
+def _encode(args, path):
+    run_ffmpeg(args + ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path])
+
+
+def make_fixtures(folder, resolution, seconds, fps=FPS):
+    """
+    Generates (or reuses) a synthetic source clip with audio, a reaction clip,
+    a green-screen reaction and a music track for one resolution/duration.
+    Returns {"source", "reaction", "green", "music"} paths.
+    """
+    w, h = RESOLUTIONS[resolution]
+    rw, rh = h * 9 // 16 // 2 * 2, h
+    prefix = os.path.join(folder, f"{resolution}_{seconds:g}s")
+    paths = {
+        "source": prefix + "_source.mp4",
+        "reaction": prefix + "_reaction.mp4",
+        "green": prefix + "_green.mp4",
+        "music": prefix + "_music.wav",
+    }
+    if all(os.path.exists(p) for p in paths.values()):
+        return paths
+
+    # Moving test pattern with a tone, like a downloaded source video
+    _encode(["-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate={fps}:d={seconds}",
+             "-f", "lavfi", "-i", f"sine=frequency=330:duration={seconds}",
+             "-c:a", "aac", "-shortest"], paths["source"])
+    # Reaction: a different pattern, portrait, deliberately shorter so it loops
+    _encode(["-f", "lavfi", "-i", f"smptehdbars=size={rw}x{rh}:rate={fps}:d={max(1, seconds / 2):g}"],
+            paths["reaction"])
+    # Green screen: pure green with a moving subject in the middle
+    _encode(["-f", "lavfi", "-i", f"color=c=0x00FF00:size={rw}x{rh}:rate={fps}:d={max(1, seconds / 2):g}",
+             "-f", "lavfi", "-i", f"testsrc=size={rw // 2}x{rh // 2}:rate={fps}",
+             "-filter_complex", "[0:v][1:v]overlay=x='(W-w)/2+sin(t*2)*W/8':y=(H-h)/2:shortest=1"],
+            paths["green"])
+    run_ffmpeg(["-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds * MUSIC_FRACTION:g}",
+                paths["music"]])
+    return paths
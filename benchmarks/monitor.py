@@ -0,0 +1,66 @@
+import os
+import threading
+import time
+
+import psutil
+
+SAMPLE_EVERY = 0.05  # seconds between samples
+
+
+def handle_count(proc):
+    return proc.num_handles() if os.name == "nt" else proc.num_fds()
+
+
+class Monitor(threading.Thread):
+    """
+    Samples RSS (own + children), open handles (own, and summed over the
+    children), child processes and CPU time while a benchmark runs. Child
+    CPU time is taken from the last sample of each child, so ffmpeg
+    encoder/reader processes count too.
+    """
+
+    def __init__(self, every=SAMPLE_EVERY):
+        super().__init__(daemon=True)
+        self.proc = psutil.Process()
+        self.every = every
+        self.stop = threading.Event()
+        self.samples = []
+        self.peak_handles = self.peak_children = self.peak_child_handles = 0
+        self._child_cpu = {}
+        self._cpu_start = self._own_cpu()
+        self._wall_start = time.perf_counter()
+        self.wall = None
+
+    def _own_cpu(self):
+        times = self.proc.cpu_times()
+        return times.user + times.system
+
+    def run(self):
+        while True:
+            children = self.proc.children(recursive=True)
+            rss = self.proc.memory_info().rss
+            child_handles = 0
+            for child in children:
+                try:
+                    rss += child.memory_info().rss
+                    child_handles += handle_count(child)
+                    times = child.cpu_times()
+                    self._child_cpu[child.pid] = times.user + times.system
+                except psutil.NoSuchProcess:
+                    pass
+            self.samples.append(rss)
+            self.peak_handles = max(self.peak_handles, handle_count(self.proc))
+            self.peak_children = max(self.peak_children, len(children))
+            self.peak_child_handles = max(self.peak_child_handles, child_handles)
+            if self.stop.wait(self.every):
+                break
+
+    def finish(self):
+        """
+        Stops sampling; returns (wall seconds, peak RSS bytes, CPU seconds).
+        """
+        self.stop.set()
+        self.join()
+        self.wall = time.perf_counter() - self._wall_start
+        cpu = self._own_cpu() - self._cpu_start + sum(self._child_cpu.values())
+        return self.wall, max(self.samples or [self.proc.memory_info().rss]), cpu
@@ -0,0 +1,345 @@
+"""
+Render benchmark suite on synthetic fixtures.
+
+Runs each pipeline stage in isolation (decode, resize, blur, key, composite,
+text overlay, audio mix, encode) and every layout end to end, at several
+resolutions and durations. Records frames/sec, peak RSS and CPU use to a
+JSON file and compares it against a saved baseline; exits 1 on regressions.
+
+    python -m benchmarks.suite                   # run, compare with the baseline
+    python -m benchmarks.suite --save-baseline   # run and make this the baseline
+    python -m benchmarks.suite --quick --stages blur key
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import cycle, islice
+
+import cv2
+import numpy as np
+import psutil
+from moviepy.editor import VideoClip, VideoFileClip
+
+from benchmarks.fixtures import FPS, make_fixtures
+from benchmarks.monitor import Monitor
+from pipeline.audio import mix_track, write_track
+from pipeline.blur import FitWithBlur, _interpolation, fit_size
+from pipeline.chroma import ChromaKey
+from pipeline.compositor import Layer, compose
+from pipeline.encoders import DEFAULT_PROFILE, get_profile
+from pipeline.layouts import CORNER_W, LAYOUTS, TARGET_H, TARGET_W, subscribe_banner
+from pipeline.render import build_final, make_job, render_group
+from pipeline.writer import PipeWriter
+
+# --- Benchmark settings ---
+CASES = [("480p", 2), ("720p", 4), ("1080p", 4)]   # (resolution, seconds)
+QUICK_CASES = [("480p", 2)]
+DISTINCT_FRAMES = 30   # decoded frames kept in memory and cycled by isolated stages
+REPEATS = 3            # isolated stages keep the best of this many runs
+RESULTS_FILE = "bench_results.json"
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Regression limits against the baseline
+FPS_TOLERANCE = 0.15        # fail when fps drops by more than 15%
+RSS_TOLERANCE = 0.25        # ... or peak RSS grows by more than 25%
+RSS_SLACK_MB = 32           # ... and by more than this many MB
+
+
+def _decode_frames(path, count):
+    clip = VideoFileClip(path, audio=False)
+    try:
+        n = min(count, int(clip.duration * clip.fps))
+        return [clip.get_frame(i / clip.fps).copy() for i in range(n)]
+    finally:
+        clip.close()
+
+
+def _frame_clip(frames, duration):
+    # Clip cycling through preloaded frames, so only the stage under test does work
+    return VideoClip(lambda t: frames[int(t * FPS) % len(frames)], duration=duration)
+
+
+# --- Stages: each takes (fixtures, frame count, scratch) and returns a run() callable
+# --- that processes `n` frames; setup happens outside the timed part.
+
+def stage_decode(fx, n, scratch):
+    def run():
+        clip = VideoFileClip(fx["source"], audio=False)
+        try:
+            for i in range(n):
+                clip.get_frame(i / clip.fps)
+        finally:
+            clip.close()
+        return n
+    return run
+
+
+def stage_resize(fx, n, scratch):
+    frames = scratch["source_frames"]
+    src_h, src_w = frames[0].shape[:2]
+    size = fit_size(src_w, src_h, TARGET_W, TARGET_H)
+    interpolation = _interpolation(src_w, src_h, *size)
+
+    def run():
+        for frame in islice(cycle(frames), n):
+            cv2.resize(frame, size, interpolation=interpolation)
+        return n
+    return run
+
+
+def stage_blur(fx, n, scratch):
+    frames = scratch["source_frames"]
+    fit = FitWithBlur(TARGET_W, TARGET_H)
+
+    def run():
+        for frame in islice(cycle(frames), n):
+            fit(frame)
+        return n
+    return run
+
+
+def stage_key(fx, n, scratch):
+    frames = scratch["green_frames"]
+    keyer = ChromaKey()
+
+    def run():
+        for frame in islice(cycle(frames), n):
+            keyer.key(frame)
+        return n
+    return run
+
+
+def stage_composite(fx, n, scratch):
+    duration = n / FPS
+    fit = FitWithBlur(TARGET_W, TARGET_H)
+    backgrounds = [fit(f).copy() for f in scratch["source_frames"]]
+    keyer = ChromaKey()
+    rgb, alpha = [], []
+    for frame in scratch["green_frames"]:
+        h = round(frame.shape[0] * CORNER_W / frame.shape[1])
+        small = cv2.resize(frame, (CORNER_W, h), interpolation=cv2.INTER_AREA)
+        keyed, a = keyer.key(small)
+        rgb.append(keyed)
+        alpha.append(a)
+
+    reaction = Layer(_frame_clip(rgb, duration), (0, TARGET_H - rgb[0].shape[0]),
+                     alpha=lambda t: alpha[int(t * FPS) % len(alpha)])
+    composite = compose([Layer(_frame_clip(backgrounds, duration), (0, 0)), reaction], (TARGET_W, TARGET_H))
+
+    def run():
+        for i in range(n):
+            composite.get_frame(i / FPS)
+        return n
+    return run
+
+
+def stage_text(fx, n, scratch):
+    layer = subscribe_banner(n / FPS, FPS)
+    frame = np.zeros((TARGET_H, TARGET_W, 3), dtype=np.uint8)
+
+    def run():
+        for i in range(n):
+            layer.blend(frame, i / FPS)
+        return n
+    return run
+
+
+def stage_audio_mix(fx, n, scratch):
+    duration = n / FPS
+    output = os.path.join(scratch["folder"], "audio.m4a")
+
+    def run():
+        # Music / source PCM is cached per process after the first repeat, as in a batch
+        track = mix_track(duration, fx["music"], 0.4, fx["source"], 0.8, duck=0.5)
+        write_track(track, output)
+        return n  # video frames' worth of audio
+    return run
+
+
+def stage_encode(fx, n, scratch):
+    fit = FitWithBlur(TARGET_W, TARGET_H)
+    frames = [fit(f).copy() for f in scratch["source_frames"]]
+    profile = get_profile(scratch["encoder"])
+    output = os.path.join(scratch["folder"], "encode.mp4")
+
+    def run():
+        with PipeWriter(output, (TARGET_W, TARGET_H), FPS, profile) as writer:
+            for frame in islice(cycle(frames), n):
+                writer.write(frame)
+        return n
+    return run
+
+
+def end_to_end(layout):
+    def stage(fx, n, scratch):
+        reaction = fx["green"] if layout.startswith("keyed") else fx["reaction"]
+        output = os.path.join(scratch["folder"], f"e2e_{layout}.mp4")
+        job = make_job(fx["source"], layout, reaction, fx["music"], output, encoder=scratch["encoder"])
+        # Build the layout once untimed, so one-off keyed / frame-cache builds are not measured
+        source = VideoFileClip(fx["source"])
+        try:
+            build_final(source, job)
+        finally:
+            source.close()
+        return lambda: render_group([job])
+    return stage
+
+
+STAGES = {
+    "decode": stage_decode,
+    "resize": stage_resize,
+    "blur": stage_blur,
+    "key": stage_key,
+    "composite": stage_composite,
+    "text": stage_text,
+    "audio_mix": stage_audio_mix,
+    "encode": stage_encode,
+}
+STAGES.update({f"e2e_{layout}": end_to_end(layout) for layout in LAYOUTS})
+
+
+def measure(run, repeats):
+    """
+    Runs `run` `repeats` times under the resource monitor; keeps the fastest run.
+    """
+    best = None
+    for _ in range(repeats):
+        monitor = Monitor()
+        monitor.start()
+        frames = run()
+        wall, peak_rss, cpu = monitor.finish()
+        result = {
+            "frames": frames,
+            "seconds": round(wall, 4),
+            "fps": round(frames / wall, 2),
+            "peak_rss_mb": round(peak_rss / 1024 / 1024, 1),
+            "cpu_percent": round(100 * cpu / wall / psutil.cpu_count(), 1),
+        }
+        if best is None or result["fps"] > best["fps"]:
+            best = result
+    return best
+
+
+def _run_stage(name, fx, n, encoder, fixture_dir):
+    scratch = {
+        "folder": fixture_dir,
+        "encoder": encoder,
+        "source_frames": _decode_frames(fx["source"], DISTINCT_FRAMES),
+        "green_frames": _decode_frames(fx["green"], DISTINCT_FRAMES),
+    }
+    run = STAGES[name](fx, n, scratch)
+    return measure(run, 1 if name.startswith("e2e_") else REPEATS)
+
+
+def run_suite(cases, stages, encoder, fixture_dir):
+    """
+    Runs every stage for every case, each in a fresh process so its peak
+    RSS is its own and not left over from the stage before.
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for resolution, seconds in cases:
+        fx = make_fixtures(fixture_dir, resolution, seconds)
+        n = int(seconds * FPS)
+        for name in stages:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(_run_stage, name, fx, n, encoder, fixture_dir).result()
+            key = f"{resolution}_{seconds:g}s/{name}"
+            results[key] = result
+            print(f"⏱️ {key:28s} {result['fps']:9.1f} fps  {result['peak_rss_mb']:7.0f} MB  "
+                  f"{result['cpu_percent']:5.1f}% CPU")
+    return results
+
+
+def compare(results, baseline):
+    """
+    Returns a list of regression messages (empty when everything is within limits).
+    """
+    regressions = []
+    for key, base in baseline.items():
+        current = results.get(key)
+        if current is None:
+            continue
+        if current["fps"] < base["fps"] * (1 - FPS_TOLERANCE):
+            regressions.append(f"{key}: {base['fps']:.1f} -> {current['fps']:.1f} fps")
+        rss_limit = base["peak_rss_mb"] * (1 + RSS_TOLERANCE)
+        if current["peak_rss_mb"] > max(rss_limit, base["peak_rss_mb"] + RSS_SLACK_MB):
+            regressions.append(f"{key}: peak RSS {base['peak_rss_mb']:.0f} -> {current['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def machine_info():
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": psutil.cpu_count(),
+        "memory_gb": round(psutil.virtual_memory().total / 1024 ** 3, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render benchmark suite on synthetic fixtures")
+    parser.add_argument("--quick", action="store_true", help="smallest case only")
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), default=list(STAGES))
+    parser.add_argument("--encoder", default=DEFAULT_PROFILE, help="encoder profile for encode / e2e stages")
+    parser.add_argument("--out", default=RESULTS_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--fixtures", help="keep generated fixtures in this folder for later runs")
+    args = parser.parse_args(argv)
+
+    fixture_dir = args.fixtures or tempfile.mkdtemp(prefix="bench_fixtures_")
+    os.makedirs(fixture_dir, exist_ok=True)
+    try:
+        results = run_suite(QUICK_CASES if args.quick else CASES, args.stages, args.encoder, fixture_dir)
+    finally:
+        if not args.fixtures:
+            shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine_info(),
+        "encoder": args.encoder,
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Results written to {args.out}")
+
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                merged = json.load(f)
+            merged["results"].update(results)
+            report = dict(report, results=merged["results"])
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("⚠️ No baseline yet; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != report["machine"]:
+        print("⚠️ Baseline was recorded on a different machine; comparing anyway")
+
+    regressions = compare(results, baseline["results"])
+    for message in regressions:
+        print("❌ Regression:", message)
+    if regressions:
+        return 1
+    print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""
+Shared helpers for the shorts pipeline.
+
+The numbered scripts in the project root (1_file_download.py, 2_reaction.py,
+3_final.py) stay the entry points; the reusable pieces live here so they can
+be imported by the scripts, by worker processes and by the benchmarks.
+"""
@@ -0,0 +1,420 @@
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+from moviepy.editor import VideoClip, VideoFileClip
+
+from pipeline.blur import BLUR_KSIZE, BLUR_SCALE, FitWithBlur, _interpolation
+from pipeline.chroma import ChromaKey, LOWER_GREEN, UPPER_GREEN
+from pipeline.download import file_sha256
+from pipeline.telemetry import emit
+
+# --- Pre-keyed asset store ---
+ASSET_DIR_NAME = ".keyed"        # created next to the reaction clips
+FRAMES_FILE = "frames.rgba"      # raw uint8 RGBA, shape (n, h, w, 4)
+META_FILE = "meta.json"
+HASH_INDEX_FILE = "hashes.json"  # path -> size, mtime, sha256 (skips rehashing unchanged files)
+
+# --- Decoded-frame cache (reactions decoded and resized once, then looped by index) ---
+FRAME_CACHE_DIR_NAME = ".frames"  # created next to the reaction clips
+RGB_FRAMES_FILE = "frames.rgb"    # raw uint8 RGB, shape (n, h, w, 3)
+STORE_LIMIT_BYTES = 8 * 1024 ** 3  # per store; least recently used assets are dropped beyond this
+# Locks name their owner (host and PID), so a lock left by a killed process is taken over as soon
+# as it's seen; these ages only apply when the owner can't be checked (another host on a share)
+BUILD_WAIT = 3600                 # seconds before such a build lock counts as stale
+INDEX_LOCK_WAIT = 30              # seconds before such a hash index lock counts as stale (a save takes milliseconds)
+INDEX_SAVE_EVERY = 10             # seconds; while hashing many new files, the index is saved at most this often
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        # os.kill(pid, 0) would send CTRL_C_EVENT on Windows
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return ctypes.get_last_error() == 5  # access denied: it exists
+        code = ctypes.c_ulong()
+        try:
+            return not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) or code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _lock_owner():
+    return f"{socket.gethostname()} {os.getpid()}"
+
+
+def _lock_is_stale(lock_path, owner, stale_after):
+    host, _, pid = owner.rpartition(" ")
+    if host == socket.gethostname() and pid.isdigit():
+        return not _pid_alive(int(pid))
+    return time.time() - os.path.getmtime(lock_path) > stale_after
+
+
+@contextmanager
+def _file_lock(lock_path, stale_after, poll=0.05):
+    # Exclusive across processes: whoever creates the lock file holds it
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                with open(lock_path, "r", encoding="utf-8") as f:
+                    owner = f.read()
+                if _lock_is_stale(lock_path, owner, stale_after):
+                    # Only if nobody took it over in the meantime
+                    with open(lock_path, "r", encoding="utf-8") as f:
+                        if f.read() == owner:
+                            os.remove(lock_path)
+                            continue
+            except OSError:
+                pass
+            time.sleep(poll)
+    try:
+        os.write(fd, _lock_owner().encode("utf-8"))
+    finally:
+        os.close(fd)
+    try:
+        yield
+    finally:
+        os.remove(lock_path)
+
+
+class HashIndex:
+    """
+    path -> (size, mtime, sha256) of the files a store has hashed, so
+    unchanged files are never read twice. Loaded once per process and kept
+    in memory; new hashes are merged into the file on save (under a lock
+    file, so concurrent workers don't drop each other's entries).
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.path = os.path.join(store_dir, HASH_INDEX_FILE)
+        self.entries = self._load()
+        self.new = {}
+        self.saved = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def hash(self, path):
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+            return entry["sha256"]
+
+        digest = file_sha256(path)
+        with self._lock:
+            self.entries[key] = self.new[key] = {"size": st.st_size, "mtime": st.st_mtime, "sha256": digest}
+        if time.monotonic() - self.saved > INDEX_SAVE_EVERY:
+            self.save()
+        return digest
+
+    def save(self):
+        with self._lock:
+            if not self.new:
+                return
+            os.makedirs(self.store_dir, exist_ok=True)
+            with _file_lock(self.path + ".lock", INDEX_LOCK_WAIT):
+                merged = self._load()
+                merged.update(self.new)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(merged, f, indent=2)
+                os.replace(tmp_path, self.path)
+            self.entries.update(merged)
+            self.new = {}
+            self.saved = time.monotonic()
+
+
+_hash_indexes = {}
+_hash_indexes_lock = threading.Lock()
+
+
+def hash_index(store_dir):
+    """
+    This process's HashIndex for `store_dir`.
+    """
+    key = os.path.abspath(store_dir)
+    with _hash_indexes_lock:
+        if key not in _hash_indexes:
+            _hash_indexes[key] = HashIndex(store_dir)
+        return _hash_indexes[key]
+
+
+@atexit.register
+def save_hash_indexes():
+    for index in list(_hash_indexes.values()):
+        index.save()
+
+
+def _source_hash(source_path, store_dir):
+    return hash_index(store_dir).hash(source_path)
+
+
+def key_params(width=400, lower=LOWER_GREEN, upper=UPPER_GREEN, feather=0, spill=0.0):
+    """
+    Everything that changes the keyed pixels. Part of the asset key.
+    """
+    return {
+        "width": width,
+        "lower": [int(v) for v in lower],
+        "upper": [int(v) for v in upper],
+        "feather": int(feather),
+        "spill": float(spill),
+    }
+
+
+def asset_key(source_hash, params):
+    blob = json.dumps({"source": source_hash, "params": params}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:24]
+
+
+class FrameAsset:
+    """
+    A reaction clip stored as memory-mapped uint8 frames: RGBA for keyed
+    assets, RGB for decoded-frame caches. Frames are paged in by the OS on
+    demand, so opening it costs nothing, and every worker process that maps
+    the same asset shares the same pages.
+    """
+
+    def __init__(self, asset_dir):
+        with open(os.path.join(asset_dir, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        channels = self.meta.get("channels", 4)
+        shape = (self.meta["frames"], self.meta["h"], self.meta["w"], channels)
+        path = os.path.join(asset_dir, self.meta.get("file", FRAMES_FILE))
+        self.frames = np.memmap(path, dtype=np.uint8, mode="r", shape=shape)
+        self.fps = self.meta["fps"]
+        self.duration = self.meta["duration"]
+
+    def _index(self, t):
+        return int(self.fps * t + 0.00001) % len(self.frames)
+
+    def alpha(self, t):
+        """
+        uint8 alpha of the frame at time t (looped), for the fast compositor.
+        """
+        return self.frames[self._index(t), :, :, 3]
+
+    def clip(self, duration=None):
+        """
+        VideoClip of the asset (with a mask if it has alpha), looped to
+        `duration` by indexing the frame store modulo its length.
+        """
+        duration = self.duration if duration is None else duration
+        rgb = VideoClip(lambda t: self.frames[self._index(t), :, :, :3], duration=duration)
+        rgb.fps = self.fps
+        if self.frames.shape[3] == 3:
+            return rgb
+        mask = VideoClip(
+            lambda t: self.frames[self._index(t), :, :, 3].astype(np.float32) * np.float32(1 / 255),
+            ismask=True,
+            duration=duration,
+        )
+        mask.fps = self.fps
+        return rgb.set_mask(mask)
+
+
+# Pre-keyed assets were the first kind of frame asset
+KeyedAsset = FrameAsset
+
+
+def resize_to_width(frame, width):
+    """
+    Same size and interpolation as clip.resize(width=...).
+    """
+    h, w = frame.shape[:2]
+    size = (width, int(h * width / w))
+    return cv2.resize(frame, size, interpolation=_interpolation(w, h, *size))
+
+
+def build_frame_asset(source_path, asset_dir, params, transform, channels):
+    """
+    Decodes `source_path` once, runs every frame through `transform` and
+    stores the results in `asset_dir` (written to a temp folder first, so a
+    crash never leaves a half-built asset behind). Raises RuntimeError for
+    a source without frames.
+    """
+    source = VideoFileClip(source_path, audio=False)
+    tmp_dir = f"{asset_dir}.{os.getpid()}.tmp"
+    frames = None
+    try:
+        times = np.arange(0, source.duration or 0, 1.0 / source.fps) if source.fps else []
+        if len(times) == 0:
+            raise RuntimeError(f"no frames to build an asset from in {source_path}")
+
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        file_name = FRAMES_FILE if channels == 4 else RGB_FRAMES_FILE
+        for i, t in enumerate(times):
+            out = transform(source.get_frame(t))
+            if frames is None:
+                h, w = out.shape[:2]
+                frames = np.memmap(os.path.join(tmp_dir, file_name), dtype=np.uint8, mode="w+",
+                                   shape=(len(times), h, w, channels))
+            frames[i] = out
+        frames.flush()
+        frames = None
+
+        meta = {
+            "source": os.path.basename(source_path),
+            "fps": source.fps,
+            "duration": source.duration,
+            "frames": len(times),
+            "w": w,
+            "h": h,
+            "channels": channels,
+            "file": file_name,
+            "params": params,
+        }
+        with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        shutil.rmtree(asset_dir, ignore_errors=True)
+        os.replace(tmp_dir, asset_dir)
+    finally:
+        frames = None  # unmaps the file, so a failed build's temp folder can be removed (Windows)
+        source.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def build_keyed_asset(source_path, asset_dir, params):
+    """
+    Decodes, resizes and keys `source_path` once into `asset_dir` as RGBA frames.
+    """
+    keyer = ChromaKey(params["lower"], params["upper"], params["feather"], params["spill"])
+
+    def transform(frame):
+        rgb, alpha = keyer.key(resize_to_width(frame, params["width"]))
+        return np.dstack([rgb, alpha])
+
+    build_frame_asset(source_path, asset_dir, params, transform, channels=4)
+
+
+def _drop_stale(store_dir, source_name, source_hash):
+    # Assets built from earlier content of the same source. Assets of the current content
+    # with other params (e.g. a draft-size key next to the full-size one) stay; the store
+    # limit bounds those.
+    for name in os.listdir(store_dir):
+        if name.endswith(".tmp"):
+            continue
+        meta_path = os.path.join(store_dir, name, META_FILE)
+        if not os.path.exists(meta_path):
+            continue
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("source") == source_name and asset_key(source_hash, meta.get("params")) != name:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+
+def _enforce_limit(store_dir, keep, limit):
+    """
+    Drops the least recently used assets (by meta.json mtime, touched on
+    every open) until the store fits in `limit` bytes. `keep` stays.
+    """
+    assets = []
+    total = 0
+    for name in os.listdir(store_dir):
+        meta_path = os.path.join(store_dir, name, META_FILE)
+        if not os.path.exists(meta_path):
+            continue
+        size = sum(e.stat().st_size for e in os.scandir(os.path.join(store_dir, name)) if e.is_file())
+        assets.append((os.path.getmtime(meta_path), name, size))
+        total += size
+    for _, name, size in sorted(assets):
+        if total <= limit:
+            break
+        if name == keep:
+            continue
+        # On Windows an asset still mapped by another worker can't be removed; it stays until next time
+        shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+        if not os.path.exists(os.path.join(store_dir, name)):
+            total -= size
+
+
+def _ensure_asset(source_path, store_dir, params, build, event, verb, drop_stale=False, limit=STORE_LIMIT_BYTES):
+    # Shared by both stores: look up by content hash + params, build at most once
+    # across concurrent workers (the others wait on the lock file), then touch for LRU.
+    source_hash = _source_hash(source_path, store_dir)
+    hash_index(store_dir).save()  # render workers don't run atexit hooks
+    key = asset_key(source_hash, params)
+    asset_dir = os.path.join(store_dir, key)
+    meta_path = os.path.join(asset_dir, META_FILE)
+    lock_path = asset_dir + ".lock"
+
+    if not os.path.exists(meta_path):
+        with _file_lock(lock_path, BUILD_WAIT, poll=0.5):
+            if not os.path.exists(meta_path):  # unless another worker built it while we waited
+                emit(event, f"{verb} {os.path.basename(source_path)} -> {key}", source=source_path, key=key)
+                build(source_path, asset_dir, params)
+                if drop_stale:
+                    _drop_stale(store_dir, os.path.basename(source_path), source_hash)
+                _enforce_limit(store_dir, key, limit)
+
+    os.utime(meta_path)
+    return FrameAsset(asset_dir)
+
+
+def ensure_keyed_asset(source_path, store_dir=None, **params):
+    """
+    Returns the keyed FrameAsset for `source_path` + key params, building it
+    only when no asset exists for this content and these params. Building
+    drops the assets of earlier content of the same source.
+    """
+    store_dir = store_dir or os.path.join(os.path.dirname(source_path), ASSET_DIR_NAME)
+    return _ensure_asset(source_path, store_dir, key_params(**params), build_keyed_asset,
+                         "keying", "🟩 Keying", drop_stale=True)
+
+
+def _build_cached_frames(source_path, asset_dir, params):
+    if params["kind"] == "fit-blur":
+        transform = FitWithBlur(params["w"], params["h"], params["blur_ksize"], params["blur_scale"])
+    else:
+        def transform(frame):
+            return resize_to_width(frame, params["w"])
+    build_frame_asset(source_path, asset_dir, params, transform, channels=3)
+
+
+def cached_frames(source_path, width=None, fit=None, store_dir=None, limit=STORE_LIMIT_BYTES):
+    """
+    Decoded-frame cache for looped reaction clips: decodes `source_path`
+    once, either resized to `width` or fitted with blur into `fit`
+    (w, h), and returns it as a FrameAsset whose clip(duration) loops by
+    indexing instead of seeking and decoding again. The cache is a file
+    per (content, size), so every video and every worker in a batch
+    that uses the same reaction maps the same frames.
+    """
+    store_dir = store_dir or os.path.join(os.path.dirname(source_path), FRAME_CACHE_DIR_NAME)
+    if fit is not None:
+        params = {"kind": "fit-blur", "w": int(fit[0]), "h": int(fit[1]),
+                  "blur_ksize": BLUR_KSIZE, "blur_scale": BLUR_SCALE}
+    else:
+        params = {"kind": "resize", "w": int(width)}
+    return _ensure_asset(source_path, store_dir, params, _build_cached_frames,
+                         "caching", "🧊 Caching frames of", limit=limit)
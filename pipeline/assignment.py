@@ -0,0 +1,144 @@
+import json
+import math
+import os
+
+from pipeline.builds import natural_key, seeded_choice
+from pipeline.telemetry import emit
+
+# --- Reaction / music assignment ---
+PLAN_VERSION = 1
+VARIETY_WINDOW = 2  # a reaction or track isn't reused for this many neighbouring videos on either side
+LOOP_COST = 1.0     # per extra pass of a reaction or track under one video
+WASTE_COST = 0.5    # per video length of footage or audio decoded only to be trimmed away
+
+
+def loops(video_duration, duration):
+    """
+    Extra passes of a clip of `duration` needed to cover the video.
+    """
+    return max(0, math.ceil(video_duration / max(duration, 0.01) - 1e-6) - 1)
+
+
+def trimmed(video_duration, duration):
+    return max(0.0, duration - video_duration)
+
+
+def fit_cost(video_duration, duration):
+    """
+    How badly a reaction or track of `duration` fits under a video: every
+    extra loop costs LOOP_COST and every video length decoded (the whole
+    file is decoded: reactions into the frame cache, music into PCM) but
+    trimmed away costs WASTE_COST.
+    """
+    return LOOP_COST * loops(video_duration, duration) + WASTE_COST * trimmed(video_duration, duration) / max(
+        video_duration, 0.1
+    )
+
+
+class AssignmentPlan:
+    """
+    The reaction and music track of every source video, chosen from probed
+    durations and kept in a JSON plan file, so every run (and every stage
+    that renders) pairs them the same way.
+
+    A new video gets the reaction and the track with the lowest fit_cost
+    among those not used by the VARIETY_WINDOW planned videos on either
+    side of it (in output order); ties go to a seeded pick. Videos already
+    in the plan keep their pairing while both files are still available
+    and the video's duration is unchanged, so adding files never
+    reshuffles (and so rebuilds) finished shorts.
+    """
+
+    def __init__(self, path, window=VARIETY_WINDOW):
+        self.path = path
+        self.window = window
+        self.entries = {}
+        self.changed = False
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == PLAN_VERSION:
+                self.entries = data["videos"]
+
+    def _neighbours(self, video_file):
+        ordered = sorted(set(self.entries) | {video_file}, key=natural_key)
+        i = ordered.index(video_file)
+        return ordered[max(0, i - self.window):i] + ordered[i + 1:i + 1 + self.window]
+
+    def _pick(self, kind, video_file, video_duration, durations, neighbours):
+        used = {self.entries[name][kind] for name in neighbours}
+        # With fewer files than the window needs, repeats are unavoidable
+        candidates = sorted(name for name in durations if name not in used) or sorted(durations)
+        costs = {name: fit_cost(video_duration, durations[name]) for name in candidates}
+        best = min(costs.values())
+        return seeded_choice([name for name in candidates if costs[name] <= best + 1e-9], kind, video_file)
+
+    def assign(self, video_file, video_duration, reactions, music):
+        """
+        (reaction, music) file names for one video. `reactions` and `music`
+        map file name -> duration (files that can be used right now).
+        """
+        entry = self.entries.get(video_file)
+        if (entry and entry["reaction"] in reactions and entry["music"] in music
+                and entry["duration"] == round(video_duration, 3)):
+            return entry["reaction"], entry["music"]
+
+        neighbours = [name for name in self._neighbours(video_file) if name in self.entries]
+        reaction = self._pick("reaction", video_file, video_duration, reactions, neighbours)
+        track = self._pick("music", video_file, video_duration, music, neighbours)
+        self.entries[video_file] = {
+            "duration": round(video_duration, 3),
+            "reaction": reaction,
+            "music": track,
+            "reaction_loops": loops(video_duration, reactions[reaction]),
+            "music_loops": loops(video_duration, music[track]),
+            "music_trimmed": round(trimmed(video_duration, music[track]), 3),
+        }
+        self.changed = True
+        return reaction, track
+
+    def save(self):
+        if not self.changed:
+            return
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": PLAN_VERSION, "window": self.window,
+                       "videos": {name: self.entries[name] for name in sorted(self.entries, key=natural_key)}},
+                      f, indent=2)
+        os.replace(tmp_path, self.path)
+        self.changed = False
+
+
+def plan_assignments(plan, videos, reactions, music):
+    """
+    Assigns every video in `videos` (file name -> duration) through `plan`,
+    in output order, and saves the plan. Returns {video: (reaction, music)}
+    and reports the loops and trimmed audio of the new assignments next to
+    what the plain seeded picks would have cost.
+    """
+    new = [name for name in sorted(videos, key=natural_key)
+           if name not in plan.entries or plan.entries[name]["duration"] != round(videos[name], 3)]
+    pairs = {name: plan.assign(name, videos[name], reactions, music) for name in sorted(videos, key=natural_key)}
+    plan.save()
+
+    if new:
+        def totals(pick):
+            r_loops = m_loops = trim = 0.0
+            for name in new:
+                reaction, track = pick(name)
+                r_loops += loops(videos[name], reactions[reaction])
+                m_loops += loops(videos[name], music[track])
+                trim += trimmed(videos[name], music[track])
+            return int(r_loops), int(m_loops), trim
+
+        planned = totals(lambda name: pairs[name])
+        seeded = totals(lambda name: (seeded_choice(sorted(reactions), "reaction", name),
+                                      seeded_choice(sorted(music), "music", name)))
+        emit("assignments",
+             f"🎯 Paired {len(new)} videos: {planned[0]} reaction loops, {planned[1]} music loops, "
+             f"{planned[2]:.0f}s of music trimmed (unplanned picks: {seeded[0]}, {seeded[1]}, {seeded[2]:.0f}s)",
+             videos=len(new), reaction_loops=planned[0], music_loops=planned[1], music_trimmed=round(planned[2], 3),
+             seeded={"reaction_loops": seeded[0], "music_loops": seeded[1], "music_trimmed": round(seeded[2], 3)})
+    return pairs
@@ -0,0 +1,167 @@
+import os
+import subprocess
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from pipeline.ffmpeg import ffmpeg_binary, run_ffmpeg
+
+# --- PCM format used for every bed and mix ---
+AUDIO_FPS = 44100
+CHANNELS = 2
+
+# --- Music beds ---
+CROSSFADE = 0.5      # seconds of crossfade where a looped track wraps around
+
+# --- Ducking (music dips while the source audio is loud, e.g. speech) ---
+DUCK_WINDOW = 0.05   # seconds per level measurement
+DUCK_THRESHOLD = 0.05  # RMS level (0..1) above which the source counts as "talking"
+DUCK_RELEASE = 0.4   # seconds the gain takes to move between levels
+
+
+@lru_cache(maxsize=8)
+def _decode(path, size, mtime):
+    proc = run_ffmpeg(["-i", path, "-vn", "-f", "f32le", "-acodec", "pcm_f32le",
+                       "-ac", str(CHANNELS), "-ar", str(AUDIO_FPS), "-"])
+    pcm = np.frombuffer(proc.stdout, dtype=np.float32).reshape(-1, CHANNELS)
+    pcm.flags.writeable = False
+    return pcm
+
+
+def decode_pcm(path):
+    """
+    Decodes an audio (or video) file's sound once per process into a
+    read-only float32 array of shape (samples, 2) at AUDIO_FPS. Repeated
+    calls for an unchanged file return the cached array.
+    """
+    st = os.stat(path)
+    return _decode(os.path.abspath(path), st.st_size, st.st_mtime)
+
+
+def _loop_body(pcm, crossfade):
+    # One seamless loop period: the head overlapped with the tail it follows
+    length = len(pcm)
+    fade = min(int(crossfade * AUDIO_FPS), length // 4)
+    period = length - fade
+    body = pcm[:period].copy()
+    if fade:
+        ramp = np.linspace(0.0, np.pi / 2, fade, dtype=np.float32)[:, None]
+        body[:fade] = pcm[:fade] * np.sin(ramp) + pcm[period:] * np.cos(ramp)
+    return body, fade
+
+
+def music_bed(pcm, duration, volume=1.0, crossfade=CROSSFADE):
+    """
+    Music bed of exactly `duration` seconds: trimmed if the track is long
+    enough, otherwise tiled with an equal-power crossfade at every wrap
+    (the tail of the track fades into its head).
+    """
+    n = int(round(duration * AUDIO_FPS))
+    if len(pcm) == 0:
+        return np.zeros((n, CHANNELS), dtype=np.float32)
+    if len(pcm) >= n:
+        return pcm[:n] * np.float32(volume)
+
+    body, fade = _loop_body(pcm, crossfade)
+    bed = np.tile(body, (-(-n // len(body)), 1))[:n]
+    bed[:fade] = pcm[:fade]  # the very first pass starts clean
+    bed *= np.float32(volume)
+    return bed
+
+
+def iter_music_bed(pcm, duration, volume=1.0, crossfade=CROSSFADE, block=10.0):
+    """
+    The same bed as music_bed, in blocks of `block` seconds, so an hour-long
+    bed never has to sit in memory at once.
+    """
+    n = int(round(duration * AUDIO_FPS))
+    step = max(1, int(block * AUDIO_FPS))
+    if len(pcm) == 0:
+        for start in range(0, n, step):
+            yield np.zeros((min(n, start + step) - start, CHANNELS), dtype=np.float32)
+        return
+    if len(pcm) >= n:
+        for start in range(0, n, step):
+            yield pcm[start:min(n, start + step)] * np.float32(volume)
+        return
+
+    body, fade = _loop_body(pcm, crossfade)
+    for start in range(0, n, step):
+        index = np.arange(start, min(n, start + step)) % len(body)
+        chunk = body[index]
+        if start < fade:
+            chunk[:fade - start] = pcm[start:fade]
+        chunk *= np.float32(volume)
+        yield chunk
+
+
+def duck_gain(source, duck, threshold=DUCK_THRESHOLD, window=DUCK_WINDOW, release=DUCK_RELEASE):
+    """
+    Per-sample gain for the music: `duck` where the source is louder than
+    `threshold` (RMS per `window`), 1.0 elsewhere, with smooth transitions.
+    """
+    size = max(1, int(window * AUDIO_FPS))
+    blocks = len(source) // size
+    if blocks == 0:
+        return np.ones(len(source), dtype=np.float32)
+    mono = source[:blocks * size].mean(axis=1)
+    rms = np.sqrt((mono.reshape(blocks, size) ** 2).mean(axis=1))
+    gain = np.where(rms > threshold, np.float32(duck), np.float32(1.0))
+
+    # Moving average over the release time, then linear per-sample interpolation
+    smooth = max(1, int(release / window))
+    if smooth > 1:
+        padded = np.pad(gain, (smooth // 2, smooth - 1 - smooth // 2), mode="edge")
+        gain = np.convolve(padded, np.ones(smooth, dtype=np.float32) / smooth, mode="valid")
+    centres = (np.arange(blocks) + 0.5) * size
+    return np.interp(np.arange(len(source)), centres, gain).astype(np.float32)
+
+
+def mix_track(duration, music_path, music_volume, source_path=None, source_volume=0.0, duck=None):
+    """
+    The finished soundtrack for one output, mixed in one vectorised pass:
+    looped music bed, plus the source audio at `source_volume`, with the
+    music ducked to `duck` under loud source passages if given.
+    Returns float32 PCM, shape (samples, 2), clipped to [-1, 1].
+    """
+    out = music_bed(decode_pcm(music_path), duration, music_volume)
+    if source_path and source_volume:
+        source = decode_pcm(source_path)[:len(out)]
+        if duck is not None:
+            out[:len(source)] *= duck_gain(source, duck)[:, None]
+        out[:len(source)] += source * np.float32(source_volume)
+    np.clip(out, -1.0, 1.0, out=out)
+    return out
+
+
+def write_track(pcm, path, codec="aac", bitrate="320k", inputs=(), output_args=()):
+    """
+    Encodes a PCM track to `path` in one ffmpeg call, fed through stdin.
+    `pcm` is one (samples, 2) array or an iterable of such blocks.
+    `inputs` are extra ffmpeg inputs placed before the track's own, and
+    `output_args` go before `path`, e.g. to map and copy a video stream
+    alongside the track.
+    """
+    cmd = [ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y"] + list(inputs)
+    cmd += ["-f", "f32le", "-ar", str(AUDIO_FPS), "-ac", str(CHANNELS), "-i", "-"]
+    cmd += list(output_args) + ["-c:a", codec, "-b:a", bitrate, path]
+    blocks = [pcm] if isinstance(pcm, np.ndarray) else pcm
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    # stderr is drained on a thread so a chatty ffmpeg can't block the writes
+    stderr = []
+    drain = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+    drain.start()
+    try:
+        for block in blocks:
+            proc.stdin.write(np.ascontiguousarray(block, dtype=np.float32).data)
+    except BrokenPipeError:
+        pass
+    finally:
+        proc.stdin.close()
+        proc.wait()
+        drain.join()
+    if proc.returncode != 0:
+        tail = b"".join(stderr).decode("utf-8", "replace")[-2000:]
+        raise RuntimeError(f"ffmpeg failed ({proc.returncode}):\n{tail}")
+    return path
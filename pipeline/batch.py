@@ -0,0 +1,107 @@
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from pipeline.telemetry import emit
+
+# Each MoviePy job keeps roughly one core busy with per-frame Python work
+# on top of the ffmpeg threads it hands to the encoder.
+PYTHON_CORES_PER_JOB = 1
+
+
+def plan_workers(job_count, workers=None, threads=None, cpu_count=None):
+    """
+    Chooses (workers, ffmpeg threads per job) together so that
+    workers * (threads + PYTHON_CORES_PER_JOB) fits the machine.
+    Either value can be pinned; the other is derived from it.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    if workers is None and threads is None:
+        threads = 2 if cpu_count >= 8 else 1
+    if workers is None:
+        workers = cpu_count // (threads + PYTHON_CORES_PER_JOB)
+    elif threads is None:
+        threads = cpu_count // max(1, workers) - PYTHON_CORES_PER_JOB
+    workers = max(1, min(workers, job_count))
+    threads = max(1, threads)
+    return workers, threads
+
+
+def _run_job(render_fn, job, threads):
+    # Runs inside the worker process; never lets an exception escape so a
+    # broken input only fails its own job.
+    start = time.perf_counter()
+    result = {"name": job["name"], "ok": False, "frames": 0, "error": None}
+    try:
+        result["frames"] = render_fn(threads=threads, **job["kwargs"]) or 0
+        result["ok"] = True
+    except Exception:
+        result["error"] = traceback.format_exc(limit=-3)
+    result["wall"] = time.perf_counter() - start
+    result["fps"] = result["frames"] / result["wall"] if result["wall"] > 0 else 0.0
+    return result
+
+
+def _crashed(job, error):
+    return {"name": job["name"], "ok": False, "frames": 0, "wall": 0.0, "fps": 0.0, "error": error}
+
+
+def run_batch(render_fn, jobs, workers=None, threads=None, on_done=None):
+    """
+    Renders `jobs` (dicts with "name" and "kwargs" for `render_fn`) across a
+    process pool and returns one result dict per job, in job order.
+
+    `render_fn` must be an importable top-level function that accepts a
+    `threads` keyword and returns the number of frames it rendered.
+    """
+    workers, threads = plan_workers(len(jobs), workers, threads)
+    results = {}
+    crashed = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_job, render_fn, job, threads): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool:
+                crashed.append(i)
+                continue
+            if on_done is not None:
+                on_done(results[i])
+
+    # A worker that died hard (segfault, OOM kill) takes the whole pool with it.
+    # Rerun the affected jobs one per pool so only the real culprit fails.
+    for i in sorted(crashed):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            try:
+                results[i] = pool.submit(_run_job, render_fn, jobs[i], threads).result()
+            except BrokenProcessPool:
+                results[i] = _crashed(jobs[i], "worker process crashed")
+        if on_done is not None:
+            on_done(results[i])
+
+    return [results[i] for i in range(len(jobs))]
+
+
+def print_summary(results, wall=None):
+    """
+    Prints per-job wall time and frames/sec, then totals and failures.
+    `wall` is the elapsed time of the whole batch, if known.
+    """
+    print("📊 Batch summary")
+    for r in results:
+        status = "✅" if r["ok"] else "❌"
+        print(f"  {status} {r['name']}: {r['wall']:.1f}s, {r['frames']} frames, {r['fps']:.1f} fps")
+
+    failed = [r for r in results if not r["ok"]]
+    total_frames = sum(r["frames"] for r in results)
+    print(f"  {len(results) - len(failed)}/{len(results)} succeeded, {total_frames} frames total")
+    if wall:
+        print(f"  Batch wall time {wall:.1f}s, {total_frames / wall:.1f} fps overall")
+    for r in failed:
+        print(f"  ❌ {r['name']} failed:\n{r['error']}")
+    emit("batch_summary", jobs=len(results), failed=[r["name"] for r in failed], frames=total_frames,
+         wall=round(wall, 3) if wall else None, fps=round(total_frames / wall, 2) if wall else None)
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+
+# --- Blur defaults (match the original 55x55 GaussianBlur look) ---
+BLUR_KSIZE = 55
+BLUR_SCALE = 4  # blur at 1/4 resolution, then upscale
+
+
+def fit_size(src_w, src_h, target_w, target_h):
+    """
+    Size of the foreground when (src_w, src_h) is scaled to fit inside the target,
+    rounded the same way as clip.resize(width=...) / clip.resize(height=...).
+    """
+    if src_w / src_h > target_w / target_h:
+        return target_w, int(src_h * target_w / src_w)
+    return int(src_w * target_h / src_h), target_h
+
+
+def _interpolation(src_w, src_h, dst_w, dst_h):
+    # Same choice as MoviePy's cv2 resizer: area for shrinking, linear for growing
+    if dst_w > src_w or dst_h > src_h:
+        return cv2.INTER_LINEAR
+    return cv2.INTER_AREA
+
+
+class FitWithBlur:
+    """
+    Fused fit-with-blurred-background frame operator.
+
+    Each source frame is used once to build both layers: a downscaled copy is
+    blurred and upscaled into a preallocated output buffer, and the
+    aspect-correct foreground is written over its centre. Blurring at
+    1/`blur_scale` resolution with a proportionally smaller kernel looks the
+    same as the full-size 55x55 blur at a fraction of the cost.
+
+    The returned array is reused on the next call; copy it if you need to keep it.
+    """
+
+    def __init__(self, target_w, target_h, blur_ksize=BLUR_KSIZE, blur_scale=BLUR_SCALE):
+        self.target_w = target_w
+        self.target_h = target_h
+        self.blur_scale = max(1, int(blur_scale))
+        self.small_size = (max(1, target_w // self.blur_scale), max(1, target_h // self.blur_scale))
+        ksize = max(3, blur_ksize // self.blur_scale)
+        self.small_ksize = ksize if ksize % 2 else ksize + 1
+        self.out = np.empty((target_h, target_w, 3), dtype=np.uint8)
+        self._small = np.empty((self.small_size[1], self.small_size[0], 3), dtype=np.uint8)
+        self._src_shape = None
+
+    def _layout(self, frame):
+        src_h, src_w = frame.shape[:2]
+        fg_w, fg_h = fit_size(src_w, src_h, self.target_w, self.target_h)
+        self.fg_size = (fg_w, fg_h)
+        self.fg_pos = ((self.target_w - fg_w) // 2, (self.target_h - fg_h) // 2)
+        self._fg = np.empty((fg_h, fg_w, 3), dtype=np.uint8)
+        self._fg_interp = _interpolation(src_w, src_h, fg_w, fg_h)
+        self._src_shape = frame.shape
+
+    def __call__(self, frame):
+        if frame.dtype != np.uint8:
+            frame = frame.astype(np.uint8)
+        if frame.shape != self._src_shape:
+            self._layout(frame)
+
+        # Background: shrink -> blur small -> grow straight into the output buffer
+        cv2.resize(frame, self.small_size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.GaussianBlur(self._small, (self.small_ksize, self.small_ksize), 0, dst=self._small)
+        cv2.resize(self._small, (self.target_w, self.target_h), dst=self.out,
+                   interpolation=cv2.INTER_LINEAR)
+
+        # Foreground: resized once, pasted over the centre
+        cv2.resize(frame, self.fg_size, dst=self._fg, interpolation=self._fg_interp)
+        x, y = self.fg_pos
+        self.out[y:y + self.fg_size[1], x:x + self.fg_size[0]] = self._fg
+        return self.out
+
+
+def make_fit_with_blur(clip, target_w, target_h, blur_ksize=BLUR_KSIZE, blur_scale=BLUR_SCALE):
+    """
+    Fits video into target size while keeping aspect ratio.
+    Adds a blurred background (TikTok style), decoding each frame only once.
+    The clip's own audio is kept as the audio of the result.
+    """
+    return clip.fl_image(FitWithBlur(target_w, target_h, blur_ksize, blur_scale))
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+from pipeline.assets import hash_index
+from pipeline.encoders import get_profile
+from pipeline.layouts import BANNER_H, BANNER_TEXT, CORNER_W, TARGET_H, TARGET_W
+from pipeline.telemetry import emit
+
+# --- Build cache (kept in the output folder) ---
+BUILD_DIR_NAME = ".build"
+BUILDS_FILE = "builds.json"  # output name -> key of the inputs it was built from
+# Bump when a code change alters rendered pixels or sound, so every output is rebuilt once
+BUILD_VERSION = 1
+# Shorts used to be numbered by their position among the inputs: output_<n>_<stem>...
+_NUMBERED_OUTPUT_RE = re.compile(r"output_\d+_(.+)")
+
+
+def seeded_choice(options, *seed):
+    """
+    Picks one of `options` deterministically from `seed` (e.g. a kind and a
+    video name): the same seed gets the same pick on every run. Adding an
+    option only moves the picks that the new option wins, not all of them.
+    """
+    def weight(option):
+        blob = "\0".join([str(s) for s in seed] + [str(option)])
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+    return max(options, key=weight)
+
+
+def natural_key(name):
+    # "video_10.mp4" sorts after "video_9.mp4", so appending downloads keeps earlier positions
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", name)]
+
+
+def _unnumbered(name):
+    # "output_3_video_4_shorts.mp4" -> "output_video_4_shorts.mp4"; None for other names
+    m = _NUMBERED_OUTPUT_RE.fullmatch(name)
+    return f"output_{m.group(1)}" if m else None
+
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:24]
+
+
+class BuildCache:
+    """
+    Remembers, per output file, the key of the inputs it was built from
+    (content hashes of the files, plus every setting that changes the
+    result), so reruns can skip outputs that are already up to date.
+    Lives in `<folder>/.build/`; file hashes are cached by size and mtime
+    (pipeline.assets.HashIndex), so only new or changed files are read.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.dir = os.path.join(folder, BUILD_DIR_NAME)
+        self.path = os.path.join(self.dir, BUILDS_FILE)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        self.hashes = hash_index(self.dir)
+
+    def file_hash(self, path):
+        return self.hashes.hash(path)
+
+    def save_hashes(self):
+        """
+        Writes out file hashes computed since the last save (also done on record and at exit).
+        """
+        self.hashes.save()
+
+    def job_key(self, spec):
+        """
+        Key of one short's job spec: its source, reaction and music content,
+        the layout and its parameters, overlays, audio mix, chroma key and
+        encoder profile.
+        """
+        return _digest({
+            "version": BUILD_VERSION,
+            "source": self.file_hash(spec["source"]),
+            "reaction": self.file_hash(spec["reaction"]),
+            "music": self.file_hash(spec["music"]),
+            "layout": spec["layout"],
+            "layout_params": {
+                "size": [TARGET_W, TARGET_H], "corner_w": CORNER_W, "banner": BANNER_TEXT, "banner_h": BANNER_H,
+            },
+            "overlays": spec.get("overlays"),
+            "audio": spec.get("audio"),
+            "key": spec.get("key"),
+            "encoder": get_profile(spec.get("encoder")),
+        })
+
+    def shorts_state(self, paths):
+        """
+        name -> content hash of each short, the input state of a long video.
+        """
+        return {os.path.basename(p): self.file_hash(p) for p in paths}
+
+    def final_key(self, state, music_path, **settings):
+        return _digest({"version": BUILD_VERSION, "shorts": state,
+                        "music": self.file_hash(music_path), "settings": settings})
+
+    def part_key(self, path, **settings):
+        """
+        Key of something derived from one file alone (e.g. a short's part of the long video).
+        """
+        return _digest({"version": BUILD_VERSION, "file": self.file_hash(path), "settings": settings})
+
+    def is_current(self, output, key):
+        """
+        True when `output` exists, was built from `key` and hasn't been touched since.
+        """
+        entry = self.entries.get(os.path.basename(output))
+        return (bool(entry) and entry["key"] == key and os.path.exists(output)
+                and os.path.getsize(output) == entry["size"])
+
+    def adopt(self, output, source):
+        """
+        Renames shorts of `source` recorded under an old position-numbered
+        name to `output` (keeping their entry, so they aren't rendered
+        again) and removes any further numbered copies, which would
+        otherwise all end up in the long video.
+        """
+        name = os.path.basename(output)
+        numbered = [
+            old for old, entry in self.entries.items()
+            if entry.get("source") == os.path.basename(source) and _unnumbered(old) == name
+        ]
+        if not numbered:
+            return
+        folder = os.path.dirname(output)
+        numbered.sort(key=lambda old: self.entries[old].get("built", 0), reverse=True)
+        for old in numbered:
+            old_path = os.path.join(folder, old)
+            entry = self.entries.pop(old)
+            if not os.path.exists(old_path):
+                continue
+            if name not in self.entries and not os.path.exists(output):
+                os.replace(old_path, output)
+                self.entries[name] = entry
+                emit("adopted", f"🏷️ Renamed {old} -> {name}", old=old, new=name)
+            else:
+                os.remove(old_path)
+        self._save()
+
+    def changed(self, output, state):
+        """
+        Names in `state` that are new or differ from what `output` was last built from.
+        """
+        before = (self.entries.get(os.path.basename(output)) or {}).get("shorts", {})
+        return [name for name, digest in state.items() if before.get(name) != digest]
+
+    def record(self, output, key, **fields):
+        self.entries[os.path.basename(output)] = dict(
+            key=key, size=os.path.getsize(output), built=round(time.time(), 3), **fields
+        )
+        self._save()
+
+    def _save(self):
+        self.hashes.save()
+        os.makedirs(self.dir, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,42 @@
+import cv2
+import numpy as np
+
+# --- Green range in OpenCV HSV (tune if needed) ---
+LOWER_GREEN = np.array([35, 60, 60], dtype=np.uint8)
+UPPER_GREEN = np.array([85, 255, 255], dtype=np.uint8)
+
+
+class ChromaKey:
+    """
+    Green-screen key that computes the mask once per frame.
+
+    `key(frame)` returns the (spill-suppressed) RGB frame and a uint8 alpha
+    (255 = keep). Keyed reactions are built once into the asset store (see
+    pipeline.assets.ensure_keyed_asset), so nothing is keyed while rendering.
+    """
+
+    def __init__(self, lower=LOWER_GREEN, upper=UPPER_GREEN, feather=0, spill=0.0):
+        self.lower = np.asarray(lower, dtype=np.uint8)
+        self.upper = np.asarray(upper, dtype=np.uint8)
+        self.feather = int(feather)
+        self.spill = float(spill)
+
+    def key(self, frame):
+        hsv = cv2.cvtColor(frame, cv2.COLOR_RGB2HSV)
+        alpha = cv2.inRange(hsv, self.lower, self.upper)
+        cv2.bitwise_not(alpha, dst=alpha)
+
+        # Soft edge: blur the binary matte
+        if self.feather > 0:
+            k = 2 * self.feather + 1
+            cv2.GaussianBlur(alpha, (k, k), 0, dst=alpha)
+
+        # Spill suppression: pull green down towards max(red, blue)
+        if self.spill > 0:
+            frame = frame.copy()
+            g = frame[:, :, 1].astype(np.int16)
+            limit = np.maximum(frame[:, :, 0], frame[:, :, 2])
+            excess = np.maximum(g - limit, 0)
+            frame[:, :, 1] = (g - excess * self.spill).astype(np.uint8)
+
+        return frame, alpha
@@ -0,0 +1,306 @@
+import os
+import tempfile
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from moviepy.editor import VideoFileClip
+
+from pipeline.audio import decode_pcm, iter_music_bed
+from pipeline.blur import fit_size
+from pipeline.encoders import audio_args, encoder_args, resolve_profile
+from pipeline.ffmpeg import probe, run_ffmpeg
+from pipeline.writer import PipeWriter
+
+# --- Long video format ---
+LONG_W, LONG_H = 1920, 1080
+MUSIC_VOLUME = 0.5
+
+# Assembly paths, cheapest first
+PATH_COPY = "copy"            # concat demuxer, video stream copied untouched
+PATH_DEMUX_PAD = "demux-pad"  # concat demuxer -> one scale/pad filter -> one encode
+PATH_PARTS = "parts"          # each short scaled/padded/encoded on its own -> parts joined by stream copy
+PATH_FILTER = "filter"        # per-input scale/pad + concat filter -> one encode (every short open at once)
+PATH_MOVIEPY = "moviepy"      # Python frame loop piped into ffmpeg, one short open at a time
+
+
+def _video_params(info):
+    # Parameters that must match for the concat demuxer to join streams
+    return (info.get("vcodec"), info.get("profile"), info.get("width"), info.get("height"),
+            info.get("pix_fmt"), round(info.get("fps") or 0, 2))
+
+
+def choose_path(infos):
+    """
+    Picks the cheapest valid assembly path for the probed shorts. Shorts
+    that differ go through PATH_PARTS, which keeps a fixed number of
+    inputs open however many shorts there are.
+    """
+    same_params = len({_video_params(i) for i in infos}) == 1
+    if not same_params:
+        return PATH_PARTS
+    first = infos[0]
+    if first.get("vcodec") == "h264" and (first.get("width"), first.get("height")) == (LONG_W, LONG_H):
+        return PATH_COPY
+    return PATH_DEMUX_PAD
+
+
+def long_fps(infos):
+    # The long video runs at the first short's frame rate
+    return infos[0].get("fps") or 30
+
+
+def _pad_filter(fps):
+    return (f"scale=-2:{LONG_H},pad={LONG_W}:{LONG_H}:(ow-iw)/2:(oh-ih)/2:color=black,"
+            f"setsar=1,fps={fps:g},format=yuv420p")
+
+
+def _concat_list(paths, tmp_dir):
+    list_path = os.path.join(tmp_dir, "shorts.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("\\", "/").replace("'", r"'\''")
+            f.write(f"file '{escaped}'\n")
+    return list_path
+
+
+def _music_input(music_path):
+    # Looped forever, trimmed by -t on the output
+    return ["-stream_loop", "-1", "-i", music_path]
+
+
+def assemble_ffmpeg(paths, music_path, output_path, path=None, infos=None, encoder=None, threads=None, fps=None):
+    """
+    Joins the shorts into one 1920x1080 video with looped background music,
+    entirely inside ffmpeg. Without `music_path` the video has no audio.
+    `fps` is the output frame rate (default: long_fps of these shorts).
+    Returns the assembly path that was used.
+    """
+    infos = infos or [probe(p) for p in paths]
+    path = path or choose_path(infos)
+    if path == PATH_PARTS:
+        return assemble_parts(paths, music_path, output_path, infos=infos, encoder=encoder)
+    total = sum(i["duration"] for i in infos)
+    fps = fps or long_fps(infos)
+    audio_filter = f"volume={MUSIC_VOLUME}"
+    profile = resolve_profile(encoder, duration=total)
+    encode = encoder_args(profile)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if path in (PATH_COPY, PATH_DEMUX_PAD):
+            args = ["-f", "concat", "-safe", "0", "-i", _concat_list(paths, tmp_dir)]
+            if music_path:
+                args += _music_input(music_path)
+                args += ["-map", "0:v:0", "-map", "1:a:0", "-af", audio_filter]
+            else:
+                args += ["-map", "0:v:0"]
+            if path == PATH_COPY:
+                args += ["-c:v", "copy"]
+            else:
+                args += ["-vf", _pad_filter(fps)] + encode
+        else:
+            args = []
+            for p in paths:
+                args += ["-i", p]
+            chains = [f"[{i}:v:0]{_pad_filter(fps)}[v{i}]" for i in range(len(paths))]
+            joined = "".join(f"[v{i}]" for i in range(len(paths)))
+            chains.append(f"{joined}concat=n={len(paths)}:v=1:a=0[vout]")
+            maps = ["-map", "[vout]"]
+            if music_path:
+                args += _music_input(music_path)
+                chains.append(f"[{len(paths)}:a:0]{audio_filter}[aout]")
+                maps += ["-map", "[aout]"]
+            # Graph goes in a file: hundreds of inputs overflow the Windows command line otherwise
+            script = os.path.join(tmp_dir, "graph.txt")
+            with open(script, "w", encoding="utf-8") as f:
+                f.write(";\n".join(chains))
+            args += ["-filter_complex_script", script] + maps + encode
+
+        if threads:
+            args += ["-threads", str(threads)]
+        args += audio_args(profile) if music_path else ["-an"]
+        args += ["-movflags", "+faststart", "-t", f"{total:.3f}", output_path]
+        run_ffmpeg(args)
+    return path
+
+
+def assemble_parts(paths, music_path, output_path, infos=None, encoder=None, workers=None):
+    """
+    Assembly with bounded resources for shorts that can't be joined as
+    they are: every short is scaled, padded and encoded into its own part
+    (at most `workers` ffmpegs at a time, each with one input open) at the
+    long video's frame rate, then the parts are joined by stream copy
+    while the music is laid under the whole video. Returns PATH_PARTS.
+    """
+    infos = infos or [probe(p) for p in paths]
+    workers = workers or 1
+    fps = long_fps(infos)
+    # Size-targeted bitrates come from the whole video, not from each part
+    profile = resolve_profile(encoder, duration=sum(i["duration"] for i in infos))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    # Parts go next to the output (same disk), in a folder that is always removed
+    with tempfile.TemporaryDirectory(prefix=".assembly_", dir=os.path.dirname(os.path.abspath(output_path))) as tmp_dir:
+        parts = [os.path.join(tmp_dir, f"part{i:05d}.mp4") for i in range(len(paths))]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(assemble_ffmpeg, [short], None, part, path=PATH_DEMUX_PAD, infos=[info],
+                            encoder=profile, threads=threads, fps=fps)
+                for short, info, part in zip(paths, infos, parts)
+            ]
+            for future in futures:
+                future.result()
+        assemble_ffmpeg(parts, music_path, output_path, path=PATH_COPY, infos=[probe(p) for p in parts],
+                        encoder=profile)
+    return PATH_PARTS
+
+
+def _balanced_groups(durations, count):
+    # Contiguous runs of roughly equal total duration, at most `count` of them
+    total = sum(durations)
+    groups, start, elapsed = [], 0, 0.0
+    for i, d in enumerate(durations):
+        elapsed += d
+        if elapsed >= total * (len(groups) + 1) / count and i + 1 < len(durations):
+            groups.append((start, i + 1))
+            start = i + 1
+    groups.append((start, len(durations)))
+    return groups
+
+
+def assemble_parallel(paths, music_path, output_path, workers, path=None, infos=None, encoder=None):
+    """
+    assemble_ffmpeg spread over `workers` cores: the shorts are split into
+    contiguous runs of about equal duration, every run is scaled, padded
+    and encoded by its own ffmpeg at the same time, and the encoded parts
+    (each starting on a keyframe, all with the same settings) are joined
+    by stream copy while the music is laid under the whole video. The
+    frame rate comes from all the shorts, so every part is encoded at the
+    same one (the size is always 1920x1080).
+    Returns the assembly path the parts were encoded with.
+    """
+    infos = infos or [probe(p) for p in paths]
+    path = path or choose_path(infos)
+    if path == PATH_PARTS:
+        return assemble_parts(paths, music_path, output_path, infos=infos, encoder=encoder, workers=workers)
+    groups = _balanced_groups([i["duration"] for i in infos], workers)
+    if path == PATH_COPY or len(groups) < 2:
+        return assemble_ffmpeg(paths, music_path, output_path, path=path, infos=infos, encoder=encoder)
+
+    # Size-targeted bitrates come from the whole video, not from each part
+    profile = resolve_profile(encoder, duration=sum(i["duration"] for i in infos))
+    profile.pop("target_mb", None)
+    threads = max(1, (os.cpu_count() or 1) // len(groups))
+    fps = long_fps(infos)
+
+    # Parts go next to the output (same disk), in a folder that is always removed
+    with tempfile.TemporaryDirectory(prefix=".assembly_", dir=os.path.dirname(os.path.abspath(output_path))) as tmp_dir:
+        parts = [os.path.join(tmp_dir, f"part{i:03d}.mp4") for i in range(len(groups))]
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [
+                pool.submit(assemble_ffmpeg, paths[a:b], None, part, path=path, infos=infos[a:b],
+                            encoder=profile, threads=threads, fps=fps)
+                for (a, b), part in zip(groups, parts)
+            ]
+            for future in futures:
+                future.result()
+        assemble_ffmpeg(parts, music_path, output_path, path=PATH_COPY, infos=[probe(p) for p in parts],
+                        encoder=profile)
+    return path
+
+
+class ShortStream:
+    """
+    Frame source for the MoviePy path that keeps at most one short open.
+
+    Shorts are opened lazily when the render reaches their time range and
+    closed as soon as it moves past it, so open files, ffmpeg reader
+    processes and buffers stay flat no matter how many shorts there are.
+    Each frame is scaled to fit 1920x1080 and centred on a reused black canvas.
+    """
+
+    def __init__(self, paths, durations):
+        self.paths = paths
+        self.durations = durations
+        self.starts = []
+        total = 0.0
+        for d in durations:
+            self.starts.append(total)
+            total += d
+        self.duration = total
+        self.canvas = np.zeros((LONG_H, LONG_W, 3), dtype=np.uint8)
+        self.index = -1
+        self.clip = None
+        self.opened = 0
+
+    def _open(self, index):
+        self.close()
+        self.clip = VideoFileClip(self.paths[index], audio=False)
+        self.index = index
+        self.opened += 1
+        self.canvas[:] = 0
+
+        w, h = self.clip.size
+        self.fit_w, self.fit_h = fit_size(w, h, LONG_W, LONG_H)
+        self.fit_x = (LONG_W - self.fit_w) // 2
+        self.fit_y = (LONG_H - self.fit_h) // 2
+
+    def close(self):
+        if self.clip is not None:
+            self.clip.close()
+            self.clip = None
+            self.index = -1
+
+    def frame(self, t):
+        index = min(max(bisect_right(self.starts, t) - 1, 0), len(self.paths) - 1)
+        if index != self.index:
+            self._open(index)
+        local_t = min(t - self.starts[index], max(0.0, self.durations[index] - 1.0 / self.clip.fps))
+        src = self.clip.get_frame(local_t)
+        interpolation = cv2.INTER_AREA if src.shape[0] > self.fit_h else cv2.INTER_LINEAR
+        self.canvas[self.fit_y:self.fit_y + self.fit_h, self.fit_x:self.fit_x + self.fit_w] = cv2.resize(
+            src, (self.fit_w, self.fit_h), interpolation=interpolation
+        )
+        return self.canvas
+
+
+def assemble_moviepy(paths, music_path, output_path, infos=None, encoder=None):
+    """
+    Frame-loop assembly with bounded memory: the shorts are streamed one at
+    a time through ShortStream instead of all being opened up front, and
+    the frames and the looped music bed are piped straight into ffmpeg.
+    """
+    infos = infos or [probe(p) for p in paths]
+    stream = ShortStream(paths, [i["duration"] for i in infos])
+    profile = resolve_profile(encoder, duration=stream.duration)
+    fps = long_fps(infos)
+
+    # Loop music if it's shorter than video, or trim if longer, streamed to ffmpeg in blocks
+    bed = iter_music_bed(decode_pcm(music_path), stream.duration, MUSIC_VOLUME)
+    try:
+        with PipeWriter(output_path, (LONG_W, LONG_H), fps, profile, audio=bed, threads=4) as writer:
+            for t in np.arange(0, stream.duration, 1.0 / fps):
+                writer.write(stream.frame(t))
+    finally:
+        stream.close()
+    return PATH_MOVIEPY
+
+
+def assemble(paths, music_path, output_path, method="auto", encoder=None, infos=None, workers=None):
+    """
+    Builds the long video. "auto" picks the cheapest valid ffmpeg path;
+    any PATH_* name forces that path. `encoder` is an encoder profile
+    name (used whenever the path re-encodes). `infos` are the shorts'
+    probe results if already known (e.g. from the media index); otherwise
+    each short is probed. With `workers` > 1 the re-encoding ffmpeg paths
+    run as that many parallel part encodes (see assemble_parallel and
+    assemble_parts).
+    Returns the path used.
+    """
+    if method == PATH_MOVIEPY:
+        return assemble_moviepy(paths, music_path, output_path, infos=infos, encoder=encoder)
+    path = None if method == "auto" else method
+    if workers and workers > 1:
+        return assemble_parallel(paths, music_path, output_path, workers, path=path, infos=infos, encoder=encoder)
+    return assemble_ffmpeg(paths, music_path, output_path, path=path, infos=infos, encoder=encoder)
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import yt_dlp
+
+# --- Manifest status values ---
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    Returns the hex SHA-256 of a file, read in chunks so big videos don't sit in memory.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0] if path else None
+
+
+class Manifest:
+    """
+    Persistent URL -> download record (name, file, size, sha256, status,
+    attempts). Saved as JSON after every change so a crash never loses
+    finished work.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, url):
+        with self._lock:
+            return dict(self.entries.get(url, {}))
+
+    def update(self, url, **fields):
+        with self._lock:
+            entry = self.entries.setdefault(url, {"status": STATUS_PENDING, "attempts": 0})
+            entry.update(fields)
+            self._save()
+
+    def assign_name(self, url, preferred, folder):
+        """
+        The file name (without extension) of `url`'s download. A URL keeps
+        the name it was first given, wherever it later sits in the list; a
+        new URL gets `preferred` unless another URL (or a file in `folder`)
+        already has it, then the lowest free video_<n>.
+        """
+        with self._lock:
+            entry = self.entries.setdefault(url, {"status": STATUS_PENDING, "attempts": 0})
+            # Manifests from before names were stored only have the file
+            name = entry.get("name") or _stem(entry.get("file"))
+            if not name:
+                taken = {e.get("name") or _stem(e.get("file")) for e in self.entries.values()}
+                if os.path.isdir(folder):
+                    taken.update(_stem(f) for f in os.listdir(folder))
+                name, n = preferred, 1
+                while name in taken:
+                    name = f"video_{n}"
+                    n += 1
+            if entry.get("name") != name:
+                entry["name"] = name
+                self._save()
+            return name
+
+    def is_complete(self, url):
+        """
+        True when the URL was downloaded before and the file on disk still matches the record.
+        """
+        entry = self.get(url)
+        if entry.get("status") != STATUS_DONE:
+            return False
+        path = entry.get("file")
+        return bool(path) and os.path.exists(path) and os.path.getsize(path) == entry.get("size")
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class Downloader:
+    """
+    Bounded pool of download workers.
+
+    Every worker thread keeps one YoutubeDL instance for its whole life,
+    at most `per_host` downloads hit the same host at once, and failed
+    items are retried with exponential backoff.
+    """
+
+    def __init__(self, output_folder, manifest_path, concurrency=4, per_host=2,
+                 retries=3, backoff=2.0, ydl_opts=None):
+        self.output_folder = output_folder
+        self.manifest = Manifest(manifest_path)
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.ydl_opts = dict(ydl_opts or {"format": "mp4"})
+        self._local = threading.local()
+        self._all_ydls = []
+        self._host_limits = {}
+        self._host_lock = threading.Lock()
+
+    def _ydl(self):
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            opts = dict(self.ydl_opts)
+            opts.setdefault("quiet", True)
+            opts.setdefault("noprogress", True)
+            ydl = yt_dlp.YoutubeDL(opts)
+            self._local.ydl = ydl
+            with self._host_lock:
+                self._all_ydls.append(ydl)
+        return ydl
+
+    def _host_slot(self, url):
+        host = urlparse(url).hostname or ""
+        with self._host_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def _download_once(self, url, name):
+        ydl = self._ydl()
+        # Each worker owns its YoutubeDL, so swapping the template per item is safe.
+        ydl.params["outtmpl"]["default"] = os.path.join(self.output_folder, f"{name}.%(ext)s")
+        with self._host_slot(url):
+            info = ydl.extract_info(url, download=True)
+        downloads = info.get("requested_downloads") or [{}]
+        return downloads[0].get("filepath") or ydl.prepare_filename(info)
+
+    def download(self, url, name):
+        """
+        Downloads one URL as `name`.<ext>, retrying with backoff. Returns the
+        manifest entry. `name` only counts for a URL seen for the first
+        time; after that the URL keeps its recorded name (see
+        Manifest.assign_name), so reordering the list never makes one URL
+        download over another one's file.
+        """
+        if self.manifest.is_complete(url):
+            return self.manifest.get(url)
+
+        name = self.manifest.assign_name(url, name, self.output_folder)
+        attempts = self.manifest.get(url).get("attempts", 0)
+        for attempt in range(self.retries + 1):
+            attempts += 1
+            try:
+                path = self._download_once(url, name)
+            except Exception as e:  # yt-dlp raises many different error types
+                self.manifest.update(url, status=STATUS_FAILED, attempts=attempts, error=str(e))
+                if attempt < self.retries:
+                    time.sleep(self.backoff * (2 ** attempt))
+                continue
+            self.manifest.update(
+                url,
+                status=STATUS_DONE,
+                attempts=attempts,
+                error=None,
+                file=path,
+                size=os.path.getsize(path),
+                sha256=file_sha256(path),
+            )
+            break
+        return self.manifest.get(url)
+
+    def run(self, urls, on_done=None):
+        """
+        Downloads `urls` (new ones named video_1, video_2, ... by position) and
+        returns {url: manifest entry}. `on_done(url, entry)` is called as each item finishes.
+        """
+        os.makedirs(self.output_folder, exist_ok=True)
+        results = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                futures = {
+                    pool.submit(self.download, url, f"video_{i}"): url
+                    for i, url in enumerate(urls, start=1)
+                }
+                for future in as_completed(futures):
+                    url = futures[future]
+                    results[url] = future.result()
+                    if on_done is not None:
+                        on_done(url, results[url])
+        finally:
+            self.close()
+        return results
+
+    def close(self):
+        """
+        Closes the workers' YoutubeDL instances (for callers driving `download` themselves).
+        """
+        with self._host_lock:
+            ydls, self._all_ydls = self._all_ydls, []
+        for ydl in ydls:
+            ydl.close()
+        self._local = threading.local()
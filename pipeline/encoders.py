@@ -0,0 +1,192 @@
+import os
+import re
+import subprocess
+import tempfile
+import time
+from functools import lru_cache
+
+from pipeline.ffmpeg import ffmpeg_binary, run_ffmpeg
+
+# --- Encoder profiles ---
+# Every render goes through one of these instead of hardcoding x264 settings.
+# Optional keys: "scale" (layout resolution factor), "fps" (output frame rate),
+# "target_mb" (size-targeted bitrate), "auto" (sample-encode preset search).
+PROFILES = {
+    # Layout previews: a quarter of the pixels, half the frames, fastest x264
+    "draft": {
+        "codec": "libx264",
+        "preset": "ultrafast",
+        "ffmpeg_params": ["-crf", "30", "-pix_fmt", "yuv420p", "-movflags", "+faststart"],
+        "audio_codec": "aac",
+        "audio_bitrate": "96k",
+        "scale": 0.5,
+        "fps": 15,
+    },
+    # Layout QA: a quarter of the resolution (1/16 of the pixels) at 10 fps, with a
+    # keyframe every second so contact sheets and scrubbing seek straight to frames
+    "preview": {
+        "codec": "libx264",
+        "preset": "ultrafast",
+        "ffmpeg_params": ["-crf", "32", "-g", "10", "-pix_fmt", "yuv420p", "-movflags", "+faststart"],
+        "audio_codec": "aac",
+        "audio_bitrate": "64k",
+        "scale": 0.25,
+        "fps": 10,
+    },
+    # High Quality YouTube Shorts
+    "publish": {
+        "codec": "libx264",
+        "preset": "medium",
+        "ffmpeg_params": [
+            "-crf", "18",          # High quality
+            "-pix_fmt", "yuv420p", # YouTube compatible
+            "-movflags", "+faststart",
+        ],
+        "audio_codec": "aac",
+        "audio_bitrate": "320k",   # Boost audio quality
+    },
+    # Fits each output into roughly `target_mb` (average bitrate from the duration)
+    "size": {
+        "codec": "libx264",
+        "preset": "medium",
+        "ffmpeg_params": ["-pix_fmt", "yuv420p", "-movflags", "+faststart"],
+        "audio_codec": "aac",
+        "audio_bitrate": "192k",
+        "target_mb": 30,
+    },
+    # Publish quality, but with the fastest x264 preset that still meets the
+    # quality target on a short sample encode of the source
+    "auto": {
+        "codec": "libx264",
+        "preset": "medium",
+        "ffmpeg_params": ["-crf", "18", "-pix_fmt", "yuv420p", "-movflags", "+faststart"],
+        "audio_codec": "aac",
+        "audio_bitrate": "320k",
+        "auto": {
+            "candidates": ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium"],
+            "metric": "ssim",      # "ssim", "vmaf" (needs libvmaf) or "bitrate"
+            "target": 0.98,        # min SSIM / min VMAF / max kbit/s
+            "sample_seconds": 4,
+        },
+    },
+}
+
+DEFAULT_PROFILE = "publish"
+
+
+def get_profile(name_or_profile=None):
+    """
+    Returns the profile dict for a name (or passes a dict through unchanged).
+    """
+    if isinstance(name_or_profile, dict):
+        return name_or_profile
+    name = name_or_profile or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown encoder profile {name!r}; choose from {sorted(PROFILES)}")
+    return PROFILES[name]
+
+
+def _kbps(bitrate):
+    # "320k" -> 320
+    return int(str(bitrate).rstrip("kK"))
+
+
+def size_target_params(profile, duration):
+    """
+    ffmpeg rate-control args that land the output near profile["target_mb"].
+    """
+    total_kbps = profile["target_mb"] * 8 * 1024 / max(duration, 0.1)
+    video_kbps = max(100, int(total_kbps - _kbps(profile["audio_bitrate"])))
+    return ["-b:v", f"{video_kbps}k", "-maxrate", f"{int(video_kbps * 1.5)}k", "-bufsize", f"{video_kbps * 2}k"]
+
+
+def resolve_profile(name_or_profile, source=None, duration=None, size=None):
+    """
+    Turns a profile into concrete writer settings for one render: fills in
+    the size-targeted bitrate from `duration`, and runs the sample-encode
+    preset search of "auto" profiles on `source` (scaled to `size`).
+    The keys used up are dropped, so resolving the result again (e.g. in
+    each segment worker of one short) changes nothing.
+    """
+    profile = dict(get_profile(name_or_profile))
+    if "target_mb" in profile and duration:
+        profile["ffmpeg_params"] = list(profile["ffmpeg_params"]) + size_target_params(profile, duration)
+        del profile["target_mb"]
+    if "auto" in profile and source:
+        auto = profile.pop("auto")
+        profile["preset"] = pick_preset(
+            source,
+            tuple(auto["candidates"]),
+            tuple(profile["ffmpeg_params"]),
+            auto["metric"],
+            auto["target"],
+            auto["sample_seconds"],
+            size,
+        )
+    return profile
+
+
+def encoder_args(profile):
+    """
+    Video encoder args for a plain ffmpeg command line.
+    """
+    return ["-c:v", profile["codec"], "-preset", profile["preset"]] + list(profile["ffmpeg_params"])
+
+
+def audio_args(profile):
+    return ["-c:a", profile["audio_codec"], "-b:a", profile["audio_bitrate"]]
+
+
+_SSIM_RE = re.compile(r"All:([\d.]+)")
+_VMAF_RE = re.compile(r"VMAF score[:=]\s*([\d.]+)")
+
+
+def _compare(candidate, reference, metric):
+    graph = "[0:v][1:v]ssim" if metric == "ssim" else "[0:v][1:v]libvmaf"
+    proc = subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", "-i", candidate, "-i", reference, "-lavfi", graph, "-f", "null", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    text = proc.stderr.decode("utf-8", "replace")
+    match = (_SSIM_RE if metric == "ssim" else _VMAF_RE).findall(text)
+    if not match:
+        raise RuntimeError(f"could not measure {metric}: {text[-500:]}")
+    return float(match[-1])
+
+
+@lru_cache(maxsize=32)
+def pick_preset(source, candidates, ffmpeg_params, metric, target, sample_seconds, size=None):
+    """
+    Encodes a short sample of `source` with each candidate preset and
+    returns the fastest one that meets the target (SSIM/VMAF at least
+    `target`, or bitrate at most `target` kbit/s). Falls back to the
+    best-scoring candidate when none meets it. Cached per process.
+    """
+    scale = ["-vf", f"scale={size[0]}:{size[1]}"] if size else []
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Lossless reference of the sample, so every candidate starts from the same pixels
+        reference = os.path.join(tmp_dir, "reference.mkv")
+        run_ffmpeg(["-t", str(sample_seconds), "-i", source, "-an"] + scale +
+                   ["-c:v", "libx264", "-preset", "ultrafast", "-qp", "0", "-pix_fmt", "yuv420p", reference])
+
+        for preset in candidates:
+            candidate = os.path.join(tmp_dir, f"{preset}.mp4")
+            start = time.perf_counter()
+            run_ffmpeg(["-i", reference, "-c:v", "libx264", "-preset", preset] + list(ffmpeg_params) + [candidate])
+            elapsed = time.perf_counter() - start
+
+            if metric == "bitrate":
+                score = os.path.getsize(candidate) * 8 / 1000 / sample_seconds
+                ok = score <= target
+            else:
+                score = _compare(candidate, reference, metric)
+                ok = score >= target
+            results.append((preset, elapsed, score, ok))
+
+    passing = [r for r in results if r[3]]
+    if passing:
+        return min(passing, key=lambda r: r[1])[0]
+    if metric == "bitrate":
+        return min(results, key=lambda r: r[2])[0]
+    return max(results, key=lambda r: r[2])[0]
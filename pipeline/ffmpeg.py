@@ -0,0 +1,138 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+
+from moviepy.config import get_setting
+
+
+def ffmpeg_binary():
+    """
+    The same ffmpeg MoviePy uses (FFMPEG_BINARY env var or imageio-ffmpeg's copy).
+    """
+    return get_setting("FFMPEG_BINARY")
+
+
+def ffprobe_binary():
+    """
+    ffprobe next to ffmpeg or on PATH, or None (imageio-ffmpeg ships no ffprobe).
+    """
+    ffmpeg = ffmpeg_binary()
+    sibling = os.path.join(os.path.dirname(ffmpeg), "ffprobe" + (".exe" if os.name == "nt" else ""))
+    if os.path.isfile(sibling):
+        return sibling
+    return shutil.which("ffprobe")
+
+
+def run_ffmpeg(args):
+    """
+    Runs ffmpeg with `args` (no binary, no -y needed); raises with the tail of stderr on failure.
+    """
+    cmd = [ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y"] + list(args)
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        tail = proc.stderr.decode("utf-8", "replace")[-2000:]
+        raise RuntimeError(f"ffmpeg failed ({proc.returncode}):\n{tail}")
+    return proc
+
+
+def _rate(value):
+    # "30000/1001" -> 29.97
+    if not value or value == "0/0":
+        return None
+    num, _, den = value.partition("/")
+    return float(num) / float(den or 1)
+
+
+def _probe_ffprobe(ffprobe, path):
+    proc = subprocess.run(
+        [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on {path}: {proc.stderr.decode('utf-8', 'replace')[-500:]}")
+    data = json.loads(proc.stdout)
+    info = {"duration": float(data.get("format", {}).get("duration") or 0), "audio": False}
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video" and "vcodec" not in info:
+            info.update(
+                vcodec=stream.get("codec_name"),
+                profile=stream.get("profile"),
+                width=stream.get("width"),
+                height=stream.get("height"),
+                pix_fmt=stream.get("pix_fmt"),
+                fps=_rate(stream.get("avg_frame_rate")) or _rate(stream.get("r_frame_rate")),
+            )
+        elif stream.get("codec_type") == "audio" and not info["audio"]:
+            info.update(
+                audio=True,
+                acodec=stream.get("codec_name"),
+                sample_rate=int(stream.get("sample_rate") or 0),
+                channels=stream.get("channels"),
+            )
+    return info
+
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_RE = re.compile(r"Stream #\S+.*?: Video: (\w+)(?: \((\w[^)]*)\))?.*?, (\w+)(?:\([^)]*\))?, (\d+)x(\d+)")
+_FPS_RE = re.compile(r"([\d.]+) (?:fps|tbr)")
+_AUDIO_RE = re.compile(r"Stream #\S+.*?: Audio: (\w+).*?, (\d+) Hz, (\w+)")
+
+
+def _probe_ffmpeg(path):
+    # Fallback: parse the stream summary `ffmpeg -i` prints (what MoviePy does too)
+    proc = subprocess.run([ffmpeg_binary(), "-hide_banner", "-i", path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    text = proc.stderr.decode("utf-8", "replace")
+    duration = _DURATION_RE.search(text)
+    if duration is None:
+        raise RuntimeError(f"could not probe {path}: {text[-500:]}")
+    h, m, s = duration.groups()
+    info = {"duration": int(h) * 3600 + int(m) * 60 + float(s), "audio": False}
+
+    for line in text.splitlines():
+        video = _VIDEO_RE.search(line)
+        if video and "vcodec" not in info:
+            fps = _FPS_RE.search(line)
+            info.update(
+                vcodec=video.group(1),
+                profile=video.group(2),
+                pix_fmt=video.group(3),
+                width=int(video.group(4)),
+                height=int(video.group(5)),
+                fps=float(fps.group(1)) if fps else None,
+            )
+        audio = _AUDIO_RE.search(line)
+        if audio and not info["audio"]:
+            channels = {"mono": 1, "stereo": 2}.get(audio.group(3))
+            info.update(audio=True, acodec=audio.group(1), sample_rate=int(audio.group(2)), channels=channels)
+    return info
+
+
+_PTS_TIME_RE = re.compile(r"pts_time:(-?[\d.]+)")
+
+
+def keyframe_times(path):
+    """
+    Times (seconds) of the video keyframes of `path`. Only keyframes are
+    decoded, so this is quick even on long files.
+    """
+    proc = subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", "-skip_frame", "nokey", "-i", path, "-an", "-vf", "showinfo", "-f", "null", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"could not read keyframes of {path}: {proc.stderr.decode('utf-8', 'replace')[-500:]}")
+    return [float(t) for t in _PTS_TIME_RE.findall(proc.stderr.decode("utf-8", "replace"))]
+
+
+def probe(path):
+    """
+    Stream parameters of a media file: duration, vcodec, profile, width,
+    height, pix_fmt, fps, audio, acodec, sample_rate, channels.
+    Uses ffprobe when available, otherwise parses `ffmpeg -i`.
+    """
+    ffprobe = ffprobe_binary()
+    if ffprobe:
+        return _probe_ffprobe(ffprobe, path)
+    return _probe_ffmpeg(path)
@@ -0,0 +1,89 @@
+from pipeline.assets import cached_frames, ensure_keyed_asset
+from pipeline.blur import make_fit_with_blur
+from pipeline.compositor import Layer, compose
+from pipeline.overlay import FONT_SIZE, OverlayLayer, text_overlay
+
+# --- Target output resolution (Vertical 1080p for Shorts) ---
+TARGET_W, TARGET_H = 1080, 1920
+
+# --- "Subscribe & Like" banner ---
+BANNER_TEXT = "SUBSCRIBE & Like"
+BANNER_H = 120
+
+# --- Corner reaction overlay ---
+CORNER_W = 400
+
+
+def layout_size(scale=1.0):
+    """
+    Output size for a resolution scale (draft encodes render smaller), kept even for yuv420p.
+    """
+    return int(TARGET_W * scale) // 2 * 2, int(TARGET_H * scale) // 2 * 2
+
+
+def _scaled(value, size):
+    # Pixel measure designed for TARGET_H, at the size actually being rendered
+    return max(1, round(value * size[1] / TARGET_H))
+
+
+def subscribe_banner(duration, fps, size=(TARGET_W, TARGET_H), txt=BANNER_TEXT):
+    """
+    "Subscribe & Like" text with white border near the bottom, fading in and
+    out over one second. The text image is rendered once per process and
+    kept in memory, so parallel workers never share a PNG on disk.
+    """
+    rgba = text_overlay(txt, size[0], _scaled(BANNER_H, size), font_size=_scaled(FONT_SIZE, size))
+    return OverlayLayer(rgba, (0, size[1] - _scaled(150, size)), duration, fps, fade_in=1, fade_out=1)
+
+
+def split_layout(main_clip, spec, size=(TARGET_W, TARGET_H)):
+    """
+    Main video on top, looped reaction below, both fitted with blurred backgrounds.
+    The reaction comes from the decoded-frame cache, already fitted, so
+    looping it never decodes or blurs a frame twice.
+    """
+    w, h = size
+    top_clip = make_fit_with_blur(main_clip, w, h // 2)
+    reaction_final = cached_frames(spec["reaction"], fit=(w, h // 2)).clip(duration=main_clip.duration)
+    return compose([Layer(top_clip, (0, 0)), Layer(reaction_final, (0, h - h // 2))], size)
+
+
+def corner_layout(main_clip, spec, size=(TARGET_W, TARGET_H)):
+    """
+    Main video full screen with blur, small looped reaction at the bottom-left
+    (resized once into the decoded-frame cache).
+    """
+    main_clip_resized = make_fit_with_blur(main_clip, *size)
+    asset = cached_frames(spec["reaction"], width=_scaled(CORNER_W, size))
+    reaction_small = asset.clip(duration=main_clip.duration)
+    return compose([Layer(main_clip_resized, (0, 0)), Layer(reaction_small, (0, size[1] - asset.meta["h"]))], size)
+
+
+def keyed_corner_layout(main_clip, spec, size=(TARGET_W, TARGET_H)):
+    """
+    Like the corner layout, but the green-screen reaction is keyed
+    (from the pre-keyed asset store, see prepare_reactions.py).
+    """
+    main_clip_resized = make_fit_with_blur(main_clip, *size)
+    key = spec.get("key", {})
+    asset = ensure_keyed_asset(
+        spec["reaction"], width=_scaled(CORNER_W, size), feather=key.get("feather", 0), spill=key.get("spill", 0.0)
+    )
+    reaction_cutout = asset.clip(duration=main_clip.duration)
+    return compose(
+        [Layer(main_clip_resized, (0, 0)), Layer(reaction_cutout, (0, size[1] - asset.meta["h"]), alpha=asset.alpha)],
+        size,
+    )
+
+
+# Layout name -> (builder(main_clip, spec, size), default audio mix)
+LAYOUTS = {
+    "split": (split_layout, {"source": 0.0, "music": 0.5}),
+    "corner": (corner_layout, {"source": 0.8, "music": 0.4}),
+    "keyed-corner": (keyed_corner_layout, {"source": 0.8, "music": 0.4}),
+}
+
+# Overlay name -> builder(duration, fps, size)
+OVERLAYS = {
+    "subscribe": subscribe_banner,
+}
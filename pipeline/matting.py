@@ -0,0 +1,337 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+from rembg import new_session, remove
+
+from pipeline.telemetry import PROGRESS_EVERY, emit
+
+# --- Defaults ---
+MODEL = "u2net"
+GREEN_BGR = (0, 255, 0)
+_DONE = None  # end-of-stream marker on the queues
+QUEUE_POLL = 0.1  # seconds a blocked queue put/get waits before checking for a stop
+
+# --- Temporal mask reuse presets: (keyframe interval, diff threshold, optical-flow refine) ---
+# A frame is fully segmented every `interval` frames, or sooner when its mean
+# abs difference from the last segmented frame exceeds `threshold` (0-255 scale).
+# In between, the previous mask is carried forward (optionally flow-warped).
+QUALITY_PRESETS = {
+    "full": (1, 0.0, False),       # segment every frame
+    "high": (5, 3.0, True),
+    "balanced": (12, 6.0, True),
+    "fast": (30, 10.0, False),
+}
+DIFF_WIDTH = 64    # width of the grey thumbnail used for frame differencing
+FLOW_SCALE = 0.25  # optical flow runs at this fraction of full resolution
+
+
+def alpha_meta_path(alpha_path):
+    return alpha_path + ".json"
+
+
+def load_alpha(alpha_path):
+    """
+    Memory-maps a saved alpha track: uint8 array of shape (frames, h, w).
+    """
+    with open(alpha_meta_path(alpha_path), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return np.memmap(alpha_path, dtype=np.uint8, mode="r", shape=(meta["frames"], meta["h"], meta["w"])), meta
+
+
+def composite_on_color(frame, alpha, color=GREEN_BGR):
+    """
+    frame * alpha + color * (1 - alpha) in integer math on uint8 buffers.
+    """
+    a = alpha[:, :, None].astype(np.uint16)
+    bg = np.array(color, dtype=np.uint16) * (255 - a)
+    return ((frame * a + bg + 127) // 255).astype(np.uint8)
+
+
+def _thumb(frame):
+    h, w = frame.shape[:2]
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (DIFF_WIDTH, max(1, h * DIFF_WIDTH // w)), interpolation=cv2.INTER_AREA)
+
+
+def warp_mask(alpha, prev_frame, frame):
+    """
+    Moves `alpha` (the mask of prev_frame) along the optical flow to `frame`.
+    Flow is computed at FLOW_SCALE and scaled back up.
+    """
+    h, w = alpha.shape
+    small = (max(8, int(w * FLOW_SCALE)), max(8, int(h * FLOW_SCALE)))
+    prev_gray = cv2.resize(cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY), small, interpolation=cv2.INTER_AREA)
+    gray = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), small, interpolation=cv2.INTER_AREA)
+
+    # Backward flow: frame(y, x) ~ prev_frame(y + fy, x + fx)
+    flow = cv2.calcOpticalFlowFarneback(gray, prev_gray, None, 0.5, 2, 9, 2, 5, 1.1, 0)
+    flow = cv2.resize(flow, (w, h), interpolation=cv2.INTER_LINEAR)
+    flow[:, :, 0] *= w / small[0]
+    flow[:, :, 1] *= h / small[1]
+    grid_x, grid_y = np.meshgrid(np.arange(w, dtype=np.float32), np.arange(h, dtype=np.float32))
+    return cv2.remap(alpha, grid_x + flow[:, :, 0], grid_y + flow[:, :, 1], cv2.INTER_LINEAR,
+                     borderMode=cv2.BORDER_REPLICATE)
+
+
+class MattingPipeline:
+    """
+    Streaming background removal: decoder thread -> inference workers -> ordered writer.
+
+    The stages are joined by bounded queues so decode, inference and encode
+    overlap. Each worker holds one rembg session for its whole life and
+    pulls `batch_size` frames at a time. Inference can run at `infer_scale`
+    of the source resolution; the mask is upscaled back to full size.
+
+    `quality` picks a temporal reuse preset from QUALITY_PRESETS; only
+    keyframes are segmented and the writer carries the last mask forward
+    for the frames in between. `keyframe_interval`, `diff_threshold` and
+    `flow_refine` override the preset.
+
+    The first error anywhere (a worker failing, the writer raising, Ctrl-C)
+    stops every stage: nothing blocks on a queue once the run is stopping.
+    """
+
+    def __init__(self, input_video, output_video, alpha_path=None, workers=2, batch_size=4,
+                 infer_scale=1.0, model=MODEL, queue_batches=4, quality="full",
+                 keyframe_interval=None, diff_threshold=None, flow_refine=None):
+        self.input_video = input_video
+        self.output_video = output_video
+        self.alpha_path = alpha_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.infer_scale = infer_scale
+        self.model = model
+        interval, threshold, flow = QUALITY_PRESETS[quality]
+        self.keyframe_interval = interval if keyframe_interval is None else keyframe_interval
+        self.diff_threshold = threshold if diff_threshold is None else diff_threshold
+        self.flow_refine = flow if flow_refine is None else flow_refine
+        self.segmented = 0
+        self.propagated = 0
+        self.in_q = queue.Queue(maxsize=queue_batches)
+        self.out_q = queue.Queue(maxsize=queue_batches * max(1, workers))
+        self.times = {"decode": 0.0, "inference": 0.0, "propagate": 0.0, "write": 0.0}
+        self._times_lock = threading.Lock()
+        self.errors = []
+        self.queue_peaks = {"decode": 0, "write": 0}
+        self._stop = threading.Event()
+
+    def _put(self, q, item):
+        # False if the run stopped before there was room
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=QUEUE_POLL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        # _DONE if the run stopped before anything arrived
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=QUEUE_POLL)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def _fail(self, error):
+        self.errors.append(error)
+        self._stop.set()
+
+    def _add_time(self, stage, seconds):
+        with self._times_lock:
+            self.times[stage] += seconds
+
+    def _is_keyframe(self, idx, thumb):
+        if self._last_key is None or self.keyframe_interval <= 1:
+            return True
+        key_idx, key_thumb = self._last_key
+        if idx - key_idx >= self.keyframe_interval:
+            return True
+        diff = cv2.absdiff(thumb, key_thumb).mean()
+        return diff > self.diff_threshold
+
+    def _decode(self, cap):
+        # Decoder thread: reads frames, marks keyframes and hands them out in batches
+        batch = []
+        idx = 0
+        self._last_key = None
+        try:
+            while True:
+                start = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    self._add_time("decode", time.perf_counter() - start)
+                    break
+                thumb = _thumb(frame) if self.keyframe_interval > 1 else None
+                is_key = self._is_keyframe(idx, thumb)
+                if is_key:
+                    self._last_key = (idx, thumb)
+                self._add_time("decode", time.perf_counter() - start)
+                batch.append((idx, frame, is_key))
+                idx += 1
+                if len(batch) == self.batch_size:
+                    if not self._put(self.in_q, batch):
+                        return
+                    batch = []
+            if batch:
+                self._put(self.in_q, batch)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.workers):
+                self._put(self.in_q, _DONE)
+
+    def _mask(self, session, frame):
+        h, w = frame.shape[:2]
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if self.infer_scale != 1.0:
+            small_size = (max(1, int(w * self.infer_scale)), max(1, int(h * self.infer_scale)))
+            rgb = cv2.resize(rgb, small_size, interpolation=cv2.INTER_AREA)
+        alpha = np.asarray(remove(rgb, session=session, only_mask=True))
+        if alpha.shape[:2] != (h, w):
+            alpha = cv2.resize(alpha, (w, h), interpolation=cv2.INTER_LINEAR)
+        return alpha
+
+    def _infer(self):
+        # Inference worker: one persistent rembg session, batch at a time.
+        # An error stops the whole run (see _fail) instead of letting the
+        # writer buffer the rest of the video behind the missing batch.
+        try:
+            session = new_session(self.model)
+            while True:
+                batch = self._get(self.in_q)
+                if batch is _DONE:
+                    break
+                start = time.perf_counter()
+                # Non-keyframes pass through with no mask; the writer fills them in
+                results = [
+                    (idx, frame, self._mask(session, frame) if is_key else None)
+                    for idx, frame, is_key in batch
+                ]
+                self._add_time("inference", time.perf_counter() - start)
+                if not self._put(self.out_q, results):
+                    return
+        except Exception as e:
+            self._fail(e)
+            return
+        self._put(self.out_q, _DONE)
+
+    def _write(self, out, alpha_file):
+        # Ordered writer: buffers out-of-order batches until the next index arrives
+        pending = {}
+        next_idx = 0
+        finished = 0
+        prev_frame = prev_alpha = None
+        last_progress = time.perf_counter()
+        while finished < self.workers and not self._stop.is_set():
+            # Queue depths: a full decode queue means inference is the bottleneck,
+            # a full write queue means writing is
+            depths = {"decode": self.in_q.qsize(), "write": self.out_q.qsize()}
+            for name, depth in depths.items():
+                self.queue_peaks[name] = max(self.queue_peaks[name], depth)
+            if time.perf_counter() - last_progress >= PROGRESS_EVERY:
+                last_progress = time.perf_counter()
+                emit("progress", job=os.path.basename(self.input_video), frames=next_idx, queues=depths)
+            results = self._get(self.out_q)
+            if results is _DONE:
+                finished += 1
+                continue
+            for idx, frame, alpha in results:
+                pending[idx] = (frame, alpha)
+
+            start = time.perf_counter()
+            propagate = 0.0
+            while next_idx in pending:
+                frame, alpha = pending.pop(next_idx)
+                if alpha is not None:
+                    self.segmented += 1
+                else:
+                    # Carry the previous mask forward, following motion if asked to
+                    prop_start = time.perf_counter()
+                    alpha = prev_alpha
+                    if self.flow_refine:
+                        alpha = warp_mask(prev_alpha, prev_frame, frame)
+                    propagate += time.perf_counter() - prop_start
+                    self.propagated += 1
+                prev_frame, prev_alpha = frame, alpha
+                out.write(composite_on_color(frame, alpha))
+                if alpha_file is not None:
+                    alpha_file.write(np.ascontiguousarray(alpha).tobytes())
+                next_idx += 1
+            self._add_time("propagate", propagate)
+            self._add_time("write", time.perf_counter() - start - propagate)
+        return next_idx
+
+    def run(self):
+        """
+        Processes the whole video and returns a report with frame count,
+        frames/sec and seconds spent per stage (inference is summed over workers).
+        """
+        cap = cv2.VideoCapture(self.input_video)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+        out = cv2.VideoWriter(self.output_video, fourcc, fps, (width, height))
+        alpha_file = open(self.alpha_path, "wb") if self.alpha_path else None
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._decode, args=(cap,), daemon=True)]
+        threads += [threading.Thread(target=self._infer, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        try:
+            written = self._write(out, alpha_file)
+        finally:
+            # Stop the other stages and empty the queues (releasing the frames in them)
+            self._stop.set()
+            for t in threads:
+                while t.is_alive():
+                    for q in (self.in_q, self.out_q):
+                        try:
+                            while True:
+                                q.get_nowait()
+                        except queue.Empty:
+                            pass
+                    t.join(QUEUE_POLL)
+            cap.release()
+            out.release()
+            if alpha_file is not None:
+                alpha_file.close()
+        wall = time.perf_counter() - start
+
+        if self.errors:
+            raise self.errors[0]
+
+        if self.alpha_path:
+            with open(alpha_meta_path(self.alpha_path), "w", encoding="utf-8") as f:
+                json.dump({"frames": written, "w": width, "h": height, "fps": fps}, f, indent=2)
+
+        return {
+            "frames": written,
+            "wall": wall,
+            "fps": written / wall if wall > 0 else 0.0,
+            "segmented": self.segmented,
+            "propagated": self.propagated,
+            "stages": dict(self.times),
+            "queue_peaks": dict(self.queue_peaks),
+        }
+
+
+def print_report(report):
+    print(f"📊 {report['frames']} frames in {report['wall']:.1f}s ({report['fps']:.1f} fps)")
+    print(f"  {report['segmented']} fully segmented, {report['propagated']} reused from the previous mask")
+    for stage, seconds in report["stages"].items():
+        print(f"  {stage:<10} {seconds:8.1f}s")
+    print("  (inference time is summed over all workers)")
+    peaks = report.get("queue_peaks", {})
+    if peaks:
+        print("  peak queue depth: " + ", ".join(f"{name} {depth}" for name, depth in peaks.items()))
+    emit("matting_summary", **report)
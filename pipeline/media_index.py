@@ -0,0 +1,139 @@
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline.ffmpeg import probe
+from pipeline.telemetry import emit
+
+# --- Probe index ---
+PROBE_WORKERS = 8  # probes are separate ffprobe/ffmpeg processes, so threads are enough
+QUERY_CHUNK = 500  # paths per SELECT (SQLite caps the number of bound parameters)
+FIELDS = ("duration", "fps", "width", "height", "vcodec", "profile", "pix_fmt",
+          "audio", "acodec", "sample_rate", "channels")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    duration REAL,
+    fps REAL,
+    width INTEGER,
+    height INTEGER,
+    vcodec TEXT,
+    profile TEXT,
+    pix_fmt TEXT,
+    audio INTEGER,
+    acodec TEXT,
+    sample_rate INTEGER,
+    channels INTEGER,
+    error TEXT,
+    probed REAL NOT NULL
+)
+"""
+
+
+def _probe(path):
+    # Runs on a pool thread; a broken file is recorded, not raised
+    try:
+        return probe(path), None
+    except Exception as e:
+        return None, str(e)[-500:]
+
+
+class MediaIndex:
+    """
+    Persistent stream metadata for the media library, in one SQLite file:
+    path, mtime, size, duration, fps, resolution, codecs and audio presence.
+
+    Lookups go through `infos`, which first probes (in parallel, without
+    decoding anything) only the files that are new or whose size or mtime
+    changed since they were indexed. Files that can't be probed are
+    remembered too, so they aren't retried until they change.
+    """
+
+    def __init__(self, db_path, workers=PROBE_WORKERS):
+        self.db_path = db_path
+        self.workers = workers
+        folder = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute(_SCHEMA)
+
+    def _rows(self, paths):
+        rows = {}
+        for i in range(0, len(paths), QUERY_CHUNK):
+            chunk = paths[i:i + QUERY_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for row in self.conn.execute(f"SELECT * FROM media WHERE path IN ({marks})", chunk):
+                rows[row["path"]] = row
+        return rows
+
+    def update(self, paths):
+        """
+        Probes the files among `paths` that are new or changed. Returns how many were probed.
+        """
+        paths = [os.path.abspath(p) for p in paths]
+        stats = {p: os.stat(p) for p in paths}
+        known = self._rows(paths)
+        stale = [
+            p for p in paths
+            if p not in known or (known[p]["mtime"], known[p]["size"]) != (stats[p].st_mtime, stats[p].st_size)
+        ]
+        if not stale:
+            return 0
+
+        emit("probing", f"🔎 Probing {len(stale)} new or changed files", files=len(stale))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(_probe, stale))
+
+        now = time.time()
+        rows = []
+        for path, (info, error) in zip(stale, results):
+            info = info or {}
+            values = [info.get(field) for field in FIELDS]
+            rows.append([path, stats[path].st_mtime, stats[path].st_size] + values + [error, now])
+        columns = ("path", "mtime", "size") + FIELDS + ("error", "probed")
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO media ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows,
+            )
+        emit("probed", files=len(stale), failed=sum(1 for _, error in results if error),
+             seconds=round(time.perf_counter() - start, 3))
+        return len(stale)
+
+    def infos(self, paths):
+        """
+        probe()-style dicts for `paths`, in order (None for files that
+        couldn't be probed), refreshing the index first.
+        """
+        self.update(paths)
+        rows = self._rows([os.path.abspath(p) for p in paths])
+        infos = []
+        for path in paths:
+            row = rows[os.path.abspath(path)]
+            if row["error"] is not None:
+                infos.append(None)
+                continue
+            info = {field: row[field] for field in FIELDS}
+            info["audio"] = bool(info["audio"])
+            infos.append(info)
+        return infos
+
+    def info(self, path):
+        return self.infos([path])[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,119 @@
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# --- Font settings ---
+FONT_PATH = "arialbd.ttf"
+FONT_SIZE = 40
+
+
+@lru_cache(maxsize=None)
+def _font(font_path, font_size):
+    return ImageFont.truetype(font_path, font_size)
+
+
+@lru_cache(maxsize=64)
+def text_overlay(text, width, height, font_path=FONT_PATH, font_size=FONT_SIZE,
+                 fill="red", stroke_fill="white", stroke_width=2):
+    """
+    Renders centred text with a border into an RGBA array, once per distinct
+    (text, size, font, colours). Uses Pillow's native stroke instead of
+    redrawing the text at every offset. The array is read-only because it
+    is shared by every caller.
+    """
+    font = _font(font_path, font_size)
+    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    bbox = draw.textbbox((0, 0), text, font=font)
+    w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+    text_x = (width - w) // 2
+    text_y = (height - h) // 2
+    draw.text((text_x, text_y), text, font=font, fill=fill, stroke_width=stroke_width, stroke_fill=stroke_fill)
+
+    rgba = np.array(img)
+    rgba.flags.writeable = False
+    return rgba
+
+
+@lru_cache(maxsize=64)
+def image_overlay(path, width=None, height=None):
+    """
+    Loads a logo/PNG as an RGBA array once, optionally resized. Read-only, like text_overlay.
+    """
+    img = Image.open(path).convert("RGBA")
+    if width or height:
+        w = width or round(img.width * height / img.height)
+        h = height or round(img.height * width / img.width)
+        img = img.resize((w, h), Image.LANCZOS)
+    rgba = np.array(img)
+    rgba.flags.writeable = False
+    return rgba
+
+
+class OverlayLayer:
+    """
+    A static RGBA overlay blended straight into frames.
+
+    The premultiplied colour, the alpha and the fade curve (one factor per
+    output frame, 0..256) are computed up front, so per frame the work is
+    one integer blend over the overlay's own rectangle.
+    """
+
+    def __init__(self, rgba, pos, duration, fps, fade_in=0, fade_out=0):
+        alpha = rgba[:, :, 3:4].astype(np.uint16)
+        self.alpha = alpha
+        self.premul = (rgba[:, :, :3].astype(np.uint16) * alpha + 127) // 255
+        self.pos = pos
+        self.fps = fps
+
+        # Fade curve: linear ramps like clip.fadein / clip.fadeout
+        n = max(1, int(round(duration * fps)))
+        t = np.arange(n) / fps
+        fade = np.ones(n)
+        if fade_in > 0:
+            fade = np.minimum(fade, t / fade_in)
+        if fade_out > 0:
+            fade = np.minimum(fade, (duration - t) / fade_out)
+        self.fade = np.round(np.clip(fade, 0, 1) * 256).astype(np.uint16)
+
+    def blend(self, frame, t):
+        """
+        Blends the overlay into `frame` in place (the frame must be writable) and returns it.
+        """
+        f = self.fade[min(int(self.fps * t + 0.00001), len(self.fade) - 1)]
+        if f == 0:
+            return frame
+
+        h, w = self.alpha.shape[:2]
+        x, y = self.pos
+        # Clip the overlay rectangle to the frame
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(frame.shape[1], x + w), min(frame.shape[0], y + h)
+        if x0 >= x1 or y0 >= y1:
+            return frame
+        sy, sx = slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)
+
+        region = frame[y0:y1, x0:x1]
+        alpha = self.alpha[sy, sx]
+        premul = self.premul[sy, sx]
+        if f < 256:
+            alpha = (alpha * f) >> 8
+            premul = (premul * f) >> 8
+        region[:] = premul + (region * (255 - alpha) + 127) // 255
+        return frame
+
+
+def with_overlays(clip, layers):
+    """
+    Returns `clip` with the overlay layers blended into every frame.
+    """
+    def draw(gf, t):
+        frame = gf(t)
+        if not frame.flags.writeable:
+            frame = frame.copy()
+        for layer in layers:
+            layer.blend(frame, t)
+        return frame
+
+    return clip.fl(draw)
@@ -0,0 +1,545 @@
+import os
+import time
+from contextlib import nullcontext
+
+import numpy as np
+from moviepy.editor import VideoFileClip
+
+from pipeline.assignment import AssignmentPlan, plan_assignments
+from pipeline.audio import mix_track
+from pipeline.batch import plan_workers, run_batch, print_summary
+from pipeline.builds import BuildCache, natural_key, seeded_choice
+from pipeline.encoders import get_profile, resolve_profile
+from pipeline.ffmpeg import probe
+from pipeline.layouts import LAYOUTS, OVERLAYS, layout_size
+from pipeline.media_index import MediaIndex
+from pipeline.overlay import with_overlays
+from pipeline.segments import join_segments, plan_segments, remove_segments, segment_path
+from pipeline.sheets import folder_sheets
+from pipeline.telemetry import Progress, configure, emit, instrument, job_telemetry
+from pipeline.writer import PipeWriter
+
+VIDEO_EXTS = (".mp4", ".mov", ".avi", ".mkv")
+MUSIC_EXTS = (".mp3", ".wav", ".aac")
+
+# --- Render script settings (2_reaction.py, test.py, testtest.py pass their overrides to run_script) ---
+SCRIPT_DEFAULTS = {
+    # Folders; the first four are required
+    "input_folder": None,
+    "reaction_folder": None,
+    "music_folder": None,
+    "output_folder": None,
+    "preview_folder": None,        # preview renders (default: <output_folder>/preview)
+    # Probe results (duration, fps, size, codecs) of every media file, refreshed incrementally
+    "media_index_file": None,      # None = probe every file on each run
+    # Reaction/music pairing per video (by duration), kept so every run pairs them the same way
+    "assignment_plan_file": None,  # required for length matching
+    # Layouts to render per video (e.g. ["split", "corner"] renders both from one decode)
+    "layouts": ["split"],
+    # Encoder profile: "publish", "draft" (fast half-res preview), "preview" (quarter-res, 10 fps),
+    # "size" (~30 MB) or "auto" (fastest x264 preset meeting the quality target on a sample encode)
+    "encoder": "publish",
+    # Chroma key settings of keyed layouts ({"feather", "spill"}, see prepare_reactions.py)
+    "key": None,
+    # Preview run: render the same layouts with the "preview" profile into preview_folder and
+    # tile keyframes of every output into a contact sheet (<folder>/contact_sheets) for layout QA
+    "preview": False,
+    "contact_sheets": False,       # contact sheets after full renders too
+    # Batch sizing (None = size to the machine)
+    "batch_workers": None,         # parallel renders; 1 for the old one-at-a-time loop
+    "ffmpeg_threads": None,        # ffmpeg threads per render
+    # Split sources longer than this many seconds at keyframes and render the parts on
+    # several workers (None = one worker per video); helps when a few long videos dominate
+    "segment_seconds": None,
+    # Skip shorts whose source, reaction, music and settings are unchanged
+    "incremental": True,
+    # Pair reactions and music by duration (fewest loops, least trimming, no repeats among
+    # neighbouring videos) instead of a fixed pseudo-random pick
+    "length_matching": True,
+    # Telemetry (opt-in)
+    "events_log": None,            # e.g. "render_events.jsonl": JSON-lines events for monitoring
+    "stage_timings": False,        # time every frame per layer/stage and print a summary per video
+    "profile_dir": None,           # e.g. "profiles": one cProfile dump per video (open with snakeviz/pstats)
+    "done_message": "🎉 All videos processed successfully in 1080x1920 (Shorts format)!",
+}
+
+
+def list_media(folder, exts):
+    return [f for f in os.listdir(folder) if f.lower().endswith(exts)]
+
+
+def output_name(video_file, layout=None):
+    """
+    Name of a source video's short. It depends on the source file alone
+    (not on its position among the inputs), so every runner names a
+    short the same way and a missing earlier video renames nothing.
+    """
+    stem = os.path.splitext(video_file)[0]
+    if layout:
+        return f"output_{stem}_{layout}_shorts.mp4"
+    return f"output_{stem}_shorts.mp4"
+
+
+def make_job(source, layout, reaction, music, output, encoder=None, overlays=("subscribe",), audio=None, key=None):
+    """
+    Declarative spec for one output short.
+
+    layout   -- a name from pipeline.layouts.LAYOUTS
+    overlays -- names from pipeline.layouts.OVERLAYS, drawn on top in order
+    audio    -- {"source": volume, "music": volume, "duck": music gain under loud source
+                audio}; merged over the layout's default mix
+    encoder  -- encoder profile name (pipeline.encoders.PROFILES): "publish",
+                "draft" (fast, lower resolution), "size" or "auto"
+    key      -- chroma key settings for keyed layouts ({"feather", "spill"})
+    """
+    return {
+        "source": source,
+        "layout": layout,
+        "reaction": reaction,
+        "music": music,
+        "output": output,
+        "encoder": encoder,
+        "overlays": list(overlays),
+        "audio": audio,
+        "key": key or {},
+    }
+
+
+def job_track(spec, duration, source_has_audio=True):
+    """
+    The mixed PCM soundtrack of one job spec (see pipeline.audio.mix_track).
+    """
+    _, default_mix = LAYOUTS[spec["layout"]]
+    mix = dict(default_mix, **(spec.get("audio") or {}))
+    return mix_track(
+        duration,
+        spec["music"],
+        mix["music"],
+        spec["source"] if source_has_audio else None,
+        mix.get("source", 0.0),
+        mix.get("duck"),
+    )
+
+
+def build_final(main_clip, spec, size=None, timer=None, with_audio=True):
+    """
+    Builds the finished video clip and soundtrack for one job spec on top of an already opened
+    source, at `size` (the full layout size by default). With a telemetry `timer`, every layer,
+    the compositing, the overlays and the audio mix are timed separately.
+    Returns the clip and the mixed PCM track (None without `with_audio`).
+    """
+    size = size or layout_size()
+    layout = spec["layout"]
+    builder, _ = LAYOUTS[layout]
+    video = builder(main_clip, spec, size)
+    if timer is not None:
+        for i, layer in enumerate(getattr(video, "clips", [])):
+            instrument(layer, f"{layout}.layer{i}", timer)
+    instrument(video, f"{layout}.composite", timer)
+
+    layers = [OVERLAYS[name](main_clip.duration, main_clip.fps, size) for name in spec.get("overlays", [])]
+    if layers:
+        video = instrument(with_overlays(video, layers), f"{layout}.overlays", timer)
+
+    track = None
+    if with_audio:
+        track_fn = timer.wrap(f"audio.{layout}", job_track) if timer is not None else job_track
+        track = track_fn(spec, main_clip.duration, main_clip.audio is not None)
+    return video.set_duration(main_clip.duration), track
+
+
+def write_outputs(finals, outputs, profiles, fps, threads=4, timer=None, names=None, tracks=None, span=None):
+    """
+    Encodes several finished clips in one frame loop: every source frame
+    is decoded once and handed to each output's writer in turn. Outputs
+    whose profile sets a lower "fps" just take every n-th turn. Each
+    output has its own ffmpeg process fed through a PipeWriter, so
+    encoding runs alongside the render loop, and its PCM track (`tracks`)
+    is piped in and encoded by the same process. If anything fails, every
+    partial output is removed.
+    `span` = (start, end) seconds (end None = to the end) renders only the
+    frames in that range, for one segment of a segmented render; frames
+    keep their absolute times, so reaction loops and overlay fades line up
+    with the neighbouring segments.
+    With a telemetry `timer`, the time handing frames to each encoder and
+    its queue depth are recorded per output (`names`), along with each
+    encoder's throughput.
+    Returns the number of frames written (over all outputs).
+    """
+    writers = []
+    writes = []
+    duration = finals[0].duration
+    out_fps = [min(fps, profile.get("fps") or fps) for profile in profiles]
+    names = names or [os.path.basename(output) for output in outputs]
+    tracks = tracks or [None] * len(finals)
+    try:
+        for final, track, output, profile, rate, name in zip(finals, tracks, outputs, profiles, out_fps, names):
+            writers.append(PipeWriter(output, final.size, rate, profile, audio=track, threads=threads,
+                                      timer=timer, name=name))
+            write = writers[-1].write
+            writes.append(timer.wrap(f"encode.{name}", write) if timer is not None else write)
+
+        times = np.arange(0, duration, 1.0 / fps)
+        first, last = 0, len(times)
+        if span is not None:
+            first = int(np.searchsorted(times, span[0] - 1e-6))
+            if span[1] is not None:
+                last = int(np.searchsorted(times, span[1] - 1e-6))
+        written = [0] * len(finals)
+        # Output frames that earlier segments wrote, so lower-fps outputs keep their cadence
+        for t in times[:first]:
+            for i in range(len(finals)):
+                if written[i] < t * out_fps[i] + 1e-6:
+                    written[i] += 1
+        before = list(written)
+
+        progress = Progress(os.path.basename(outputs[0]), last - first, timer)
+        for t in times[first:last]:
+            for i, final in enumerate(finals):
+                # Next frame of this output is due at written / rate
+                if written[i] < t * out_fps[i] + 1e-6:
+                    writes[i](final.get_frame(t))
+                    written[i] += 1
+            progress.frame(t)
+        for writer in writers:
+            writer.close()
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
+
+    written = [w - b for w, b in zip(written, before)]
+    if timer is not None:
+        timer.frames = last - first
+        timer.outputs = {}
+        for name, count, final in zip(names, written, finals):
+            seconds = timer.totals.get(f"encode.{name}", 0.0)
+            frame_mb = final.w * final.h * 3 / 1024 / 1024
+            timer.outputs[name] = {
+                "frames": count,
+                "encode_seconds": round(seconds, 3),
+                "encode_fps": round(count / seconds, 2) if seconds > 0 else None,
+                "encode_mb_per_s": round(count * frame_mb / seconds, 1) if seconds > 0 else None,
+            }
+    return sum(written)
+
+
+def render_group(jobs, threads=4, segment=None):
+    """
+    Renders every job spec in `jobs` (all with the same source video) from a
+    single decode of that source. Reaction files shared by several layouts
+    are opened once too. With `segment` ({"index", "span"}, see
+    pipeline.segments) only that time span is rendered, video only, into
+    each output's part file. Returns the number of frames written.
+    """
+    name = jobs[0]["source"] if segment is None else f"{jobs[0]['source']}.part{segment['index']:03d}"
+    with job_telemetry(name) as timer:
+        return _render_group(jobs, threads, timer, segment)
+
+
+def _render_group(jobs, threads, timer, segment=None):
+    main_clip = instrument(VideoFileClip(jobs[0]["source"]), "decode.source", timer)
+    try:
+        finals = []
+        tracks = []
+        profiles = []
+        for spec in jobs:
+            size = layout_size(get_profile(spec.get("encoder")).get("scale", 1.0))
+            profiles.append(resolve_profile(spec.get("encoder"), spec["source"], main_clip.duration, size))
+            final, track = build_final(main_clip, spec, size, timer, with_audio=segment is None)
+            finals.append(final)
+            tracks.append(track)
+
+        outputs = [spec["output"] for spec in jobs]
+        if segment is not None:
+            outputs = [segment_path(output, segment["index"]) for output in outputs]
+            for output in outputs:
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+        return write_outputs(
+            finals,
+            outputs,
+            profiles,
+            main_clip.fps,
+            threads,
+            timer,
+            [spec["layout"] for spec in jobs],
+            tracks,
+            segment["span"] if segment is not None else None,
+        )
+    finally:
+        main_clip.close()
+
+
+def _readable(index, folder, files, kind):
+    # Drops files the media index couldn't probe (partial downloads, corrupt files)
+    infos = index.infos([os.path.join(folder, f) for f in files])
+    readable = []
+    for name, info in zip(files, infos):
+        if info is None or not info.get("duration"):
+            emit("unreadable", f"⚠️ Skipping unreadable {kind}: {name}", kind=kind, file=name)
+        else:
+            readable.append(name)
+    return readable
+
+
+def video_jobs(source, reaction_folder, reaction_files, music_folder, music_files, output_folder, layouts,
+               encoder=None, key=None, cache=None, pair=None):
+    """
+    Job specs rendering all `layouts` of one source video (outputs named
+    by output_name). Reaction and music are
+    `pair` (from an AssignmentPlan, see pipeline.assignment), or else
+    picked from a seed (the video's file name), so reruns choose the same
+    ones. With a BuildCache, outputs that are already up to date are left
+    out (so the list can be empty).
+    """
+    video_file = os.path.basename(source)
+    reaction_file, music_file = pair or (
+        seeded_choice(reaction_files, "reaction", video_file),
+        seeded_choice(music_files, "music", video_file),
+    )
+    jobs = [
+        make_job(
+            source,
+            layout,
+            os.path.join(reaction_folder, reaction_file),
+            os.path.join(music_folder, music_file),
+            os.path.join(output_folder, output_name(video_file, layout if len(layouts) > 1 else None)),
+            encoder=encoder,
+            key=key,
+        )
+        for layout in layouts
+    ]
+    if cache is not None:
+        for job in jobs:
+            cache.adopt(job["output"], source)
+            job["build_key"] = cache.job_key(job)
+        jobs = [job for job in jobs if not cache.is_current(job["output"], job["build_key"])]
+    return jobs
+
+
+def durations(index, folder, files):
+    """
+    File name -> duration for `files`, from the media index when there is one.
+    """
+    paths = [os.path.join(folder, f) for f in files]
+    infos = index.infos(paths) if index is not None else [probe(p) for p in paths]
+    return {name: info["duration"] for name, info in zip(files, infos)}
+
+
+def plan_shorts(input_folder, reaction_folder, music_folder, output_folder, layouts, encoder=None, key=None,
+                cache=None, index=None, segment_seconds=None, assignments=None):
+    """
+    Scans the folders and returns one batch job per source video, each
+    rendering all `layouts` from one decode (see video_jobs).
+    With a BuildCache (pipeline.builds), outputs whose inputs and settings
+    are unchanged since they were built are left out. With a MediaIndex
+    (pipeline.media_index), files that can't be probed are skipped up
+    front instead of failing mid-batch. With an AssignmentPlan
+    (`assignments`, pipeline.assignment), reactions and music are paired
+    with each video by duration and kept in its plan file instead of being
+    picked from a seed. With `segment_seconds`, a source
+    longer than that is split at keyframes into several batch jobs, one
+    per time span, so one long video renders on several workers at once
+    (run_shorts joins the parts). Returns None (after printing why) when a
+    folder has nothing to use.
+    """
+    video_files = sorted(list_media(input_folder, VIDEO_EXTS), key=natural_key)
+    reaction_files = sorted(list_media(reaction_folder, VIDEO_EXTS))
+    music_files = sorted(list_media(music_folder, MUSIC_EXTS))
+    if index is not None:
+        video_files = _readable(index, input_folder, video_files, "video")
+        reaction_files = _readable(index, reaction_folder, reaction_files, "reaction")
+        music_files = _readable(index, music_folder, music_files, "music")
+
+    if not video_files:
+        emit("no_input", f"⚠️ No video files found in {input_folder}", kind="video", folder=input_folder)
+        return None
+    if not reaction_files:
+        emit("no_input", f"⚠️ No reaction videos found in {reaction_folder}", kind="reaction", folder=reaction_folder)
+        return None
+    if not music_files:
+        emit("no_input", f"⚠️ No music files found in {music_folder}", kind="music", folder=music_folder)
+        return None
+
+    pairs = {}
+    if assignments is not None:
+        pairs = plan_assignments(
+            assignments,
+            durations(index, input_folder, video_files),
+            durations(index, reaction_folder, reaction_files),
+            durations(index, music_folder, music_files),
+        )
+
+    batch = []
+    for video_file in video_files:
+        jobs = video_jobs(os.path.join(input_folder, video_file), reaction_folder, reaction_files,
+                          music_folder, music_files, output_folder, layouts, encoder, key, cache,
+                          pairs.get(video_file))
+        if not jobs:
+            emit("up_to_date", f"⏭️ Up to date: {video_file}", video=video_file)
+            continue
+        reaction_file = os.path.basename(jobs[0]["reaction"])
+        music_file = os.path.basename(jobs[0]["music"])
+        emit("queued", f"🎬 Queued: {video_file} + {reaction_file} ({', '.join(job['layout'] for job in jobs)})",
+             video=video_file, reaction=reaction_file, music=music_file, layouts=[job["layout"] for job in jobs])
+        if not segment_seconds:
+            batch.append({"name": video_file, "kwargs": {"jobs": jobs}})
+            continue
+
+        source = jobs[0]["source"]
+        info = index.info(source) if index is not None else probe(source)
+        spans = plan_segments(source, info["duration"], segment_seconds)
+        if len(spans) == 1:
+            batch.append({"name": video_file, "kwargs": {"jobs": jobs}})
+            continue
+        emit("segmented", f"✂️ Splitting {video_file} into {len(spans)} segments", video=video_file,
+             spans=[[start, end] for start, end in spans])
+        # Size-targeted bitrates and "auto" presets are settled once for the whole short, so
+        # every segment is encoded alike and the preset search isn't repeated per worker
+        for job in jobs:
+            size = layout_size(get_profile(job["encoder"]).get("scale", 1.0))
+            job["encoder"] = resolve_profile(job["encoder"], source, info["duration"], size)
+        for i, span in enumerate(spans):
+            batch.append({
+                "name": f"{video_file} [{i + 1}/{len(spans)}]",
+                "kwargs": {"jobs": jobs, "segment": {"index": i, "span": span}},
+                "segment_of": {"video": video_file, "count": len(spans), "duration": info["duration"],
+                               "audio": info["audio"]},
+            })
+
+    if cache is not None:
+        cache.save_hashes()
+    if not batch:
+        emit("nothing_to_do", f"✅ All {len(video_files)} videos are up to date", videos=len(video_files))
+    else:
+        os.makedirs(output_folder, exist_ok=True)
+    return batch
+
+
+def run_shorts(batch, workers=None, threads=None, cache=None):
+    """
+    Renders planned shorts across the process pool and prints the batch
+    summary. Successful outputs are recorded in `cache` (a BuildCache).
+    """
+    workers, threads = plan_workers(len(batch), workers, threads)
+    emit("batch_start", f"⚙️ Rendering {len(batch)} videos with {workers} workers x {threads} ffmpeg threads",
+         videos=len(batch), workers=workers, threads=threads)
+
+    start = time.perf_counter()
+    results = run_batch(
+        render_group,
+        batch,
+        workers=workers,
+        threads=threads,
+        on_done=lambda r: emit(
+            "job_done" if r["ok"] else "job_failed",
+            f"{'✅ Saved' if r['ok'] else '❌ Failed'}: {r['name']}",
+            job=r["name"], wall=round(r["wall"], 3), frames=r["frames"], fps=round(r["fps"], 2),
+        ),
+    )
+    batch, results = _join_segments(batch, results)
+    if cache is not None:
+        for item, result in zip(batch, results):
+            if result["ok"]:
+                for job in item["kwargs"]["jobs"]:
+                    cache.record(job["output"], job["build_key"], source=os.path.basename(job["source"]))
+    print_summary(results, wall=time.perf_counter() - start)
+    return results
+
+
+def _join_segments(batch, results):
+    """
+    Joins the parts of every segmented video once all of them rendered
+    (the soundtrack is mixed here, once per output). A segmented video
+    ends up as a single batch item and result; its parts are removed
+    either way. Returns the batch and results with the parts merged.
+    """
+    groups = {}
+    for item, result in zip(batch, results):
+        if "segment_of" in item:
+            groups.setdefault(item["segment_of"]["video"], []).append((item, result))
+
+    joined = {}
+    for video, parts in groups.items():
+        segment_of = parts[0][0]["segment_of"]
+        jobs = parts[0][0]["kwargs"]["jobs"]
+        result = {
+            "name": video,
+            "ok": all(r["ok"] for _, r in parts),
+            "frames": sum(r["frames"] for _, r in parts),
+            "wall": sum(r["wall"] for _, r in parts),
+            "error": "\n".join(f"{r['name']}: {r['error']}" for _, r in parts if r["error"]) or None,
+        }
+        start = time.perf_counter()
+        for job in jobs:
+            if not result["ok"]:
+                remove_segments(job["output"], segment_of["count"])
+                continue
+            try:
+                track = job_track(job, segment_of["duration"], segment_of["audio"])
+                join_segments(job["output"], segment_of["count"], track, get_profile(job.get("encoder")))
+            except Exception as e:
+                result["ok"] = False
+                result["error"] = f"joining {os.path.basename(job['output'])}: {e}"
+        result["wall"] += time.perf_counter() - start
+        result["fps"] = result["frames"] / result["wall"] if result["wall"] else 0.0
+        emit("segments_joined" if result["ok"] else "job_failed",
+             f"{'🔗 Joined' if result['ok'] else '❌ Failed'}: {video} ({segment_of['count']} segments)",
+             job=video, segments=segment_of["count"], frames=result["frames"])
+        joined[video] = (parts[0][0], result)
+
+    merged_batch, merged_results = [], []
+    for item, result in zip(batch, results):
+        if "segment_of" not in item:
+            merged_batch.append(item)
+            merged_results.append(result)
+        elif item["kwargs"]["segment"]["index"] == 0:
+            item, result = joined[item["segment_of"]["video"]]
+            merged_batch.append({"name": result["name"], "kwargs": {"jobs": item["kwargs"]["jobs"]}})
+            merged_results.append(result)
+    return merged_batch, merged_results
+
+
+def run_script(config):
+    """
+    The whole run of a render script: plans the shorts of the input folder,
+    renders what isn't up to date and makes contact sheets if asked.
+    `config` holds the script's settings, overriding SCRIPT_DEFAULTS.
+    Returns the render results (empty when there was nothing to render).
+    """
+    unknown = sorted(set(config) - set(SCRIPT_DEFAULTS))
+    if unknown:
+        raise ValueError(f"Unknown render script settings {unknown}; choose from {sorted(SCRIPT_DEFAULTS)}")
+    c = dict(SCRIPT_DEFAULTS, **config)
+    missing = [name for name in ("input_folder", "reaction_folder", "music_folder", "output_folder") if not c[name]]
+    if missing:
+        raise ValueError(f"Render script settings {missing} are required")
+
+    configure(events=c["events_log"], timings=c["stage_timings"], profile_dir=c["profile_dir"])
+    folder = c["output_folder"]
+    if c["preview"]:
+        folder = c["preview_folder"] or os.path.join(c["output_folder"], "preview")
+    cache = BuildCache(folder) if c["incremental"] else None
+    assignments = None
+    if c["length_matching"] and c["assignment_plan_file"]:
+        assignments = AssignmentPlan(c["assignment_plan_file"])
+    with MediaIndex(c["media_index_file"]) if c["media_index_file"] else nullcontext() as index:
+        batch = plan_shorts(
+            c["input_folder"],
+            c["reaction_folder"],
+            c["music_folder"],
+            folder,
+            c["layouts"],
+            encoder="preview" if c["preview"] else c["encoder"],
+            key=c["key"],
+            cache=cache,
+            index=index,
+            assignments=assignments,
+            segment_seconds=c["segment_seconds"],
+        )
+    results = run_shorts(batch, c["batch_workers"], c["ffmpeg_threads"], cache) if batch else []
+    if c["preview"] or c["contact_sheets"]:
+        folder_sheets(folder)
+    if results and all(r["ok"] for r in results):
+        emit("all_done", c["done_message"])
+    return results
@@ -0,0 +1,68 @@
+import os
+import tempfile
+
+from pipeline.audio import write_track
+from pipeline.concat import _concat_list
+from pipeline.ffmpeg import keyframe_times
+
+# --- Segment-parallel rendering ---
+SEGMENT_DIR_NAME = ".segments"  # created in the output folder, holds the parts while they render
+MIN_SEGMENT_FRACTION = 0.5      # a cut closer than this many segment lengths to the last one is skipped
+
+
+def plan_segments(source, duration, segment_seconds):
+    """
+    Splits a render of `source` into time spans of about `segment_seconds`,
+    each starting on a source keyframe, so the worker rendering it seeks
+    straight to a decodable frame. Returns [(start, end)] in seconds; the
+    last end is None (to the end). A short source gives one span.
+    """
+    if not segment_seconds or duration < segment_seconds * (1 + MIN_SEGMENT_FRACTION):
+        return [(0.0, None)]
+    keyframes = [t for t in keyframe_times(source) if 0 < t < duration]
+    cuts = [0.0]
+    target = segment_seconds
+    while target < duration - segment_seconds * MIN_SEGMENT_FRACTION:
+        cut = min(keyframes, key=lambda t: abs(t - target)) if keyframes else target
+        if cut - cuts[-1] >= segment_seconds * MIN_SEGMENT_FRACTION and duration - cut >= segment_seconds * MIN_SEGMENT_FRACTION:
+            cuts.append(cut)
+        target += segment_seconds
+    return list(zip(cuts, cuts[1:] + [None]))
+
+
+def segment_path(output, index):
+    """
+    Where part `index` of `output` is rendered (video only), out of sight of the shorts listing.
+    """
+    folder, name = os.path.split(output)
+    return os.path.join(folder, SEGMENT_DIR_NAME, f"{os.path.splitext(name)[0]}.part{index:03d}.mp4")
+
+
+def remove_segments(output, count):
+    for index in range(count):
+        path = segment_path(output, index)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def join_segments(output, count, track, profile):
+    """
+    Joins the `count` rendered parts of `output` by stream copy (every part
+    starts on its own keyframe) and encodes the full soundtrack once
+    alongside, so there is no audio seam at the cuts. The parts are
+    removed afterwards, also when the join fails.
+    """
+    parts = [segment_path(output, index) for index in range(count)]
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            list_path = _concat_list(parts, tmp_dir)
+            write_track(
+                track,
+                output,
+                profile["audio_codec"],
+                profile["audio_bitrate"],
+                inputs=["-f", "concat", "-safe", "0", "-i", list_path],
+                output_args=["-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-movflags", "+faststart"],
+            )
+    finally:
+        remove_segments(output, count)
@@ -0,0 +1,126 @@
+import math
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from pipeline.ffmpeg import _PTS_TIME_RE, ffmpeg_binary, probe
+from pipeline.telemetry import emit
+
+# --- Contact sheets ---
+SHEET_FRAMES = 12       # thumbnails per output
+SHEET_COLUMNS = 6
+THUMB_WIDTH = 180       # pixels; portrait shorts give 180x320 tiles
+SHEET_GAP = 4
+SHEET_HEADER = 28       # title bar with the file name and duration
+SHEET_QUALITY = 85      # JPEG
+SHEET_WORKERS = 4       # outputs processed at once (each thumbnail is its own short ffmpeg run)
+SHEET_DIR_NAME = "contact_sheets"
+
+
+def keyframe_thumbnail(path, t, size, exact=False):
+    """
+    The keyframe at or before `t` of `path`, scaled to `size`, and its time.
+    ffmpeg seeks straight to it and decodes that one frame only. With
+    `exact`, the frame at `t` instead (decoding on from the keyframe).
+    """
+    w, h = size
+    seek = [] if exact else ["-skip_frame", "nokey", "-noaccurate_seek"]
+    proc = subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", *seek, "-ss", f"{t:.3f}", "-copyts", "-i", path, "-an", "-frames:v", "1",
+         "-vf", f"showinfo,scale={w}:{h}", "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    log = proc.stderr.decode("utf-8", "replace")
+    if proc.returncode != 0 or len(proc.stdout) != w * h * 3:
+        raise RuntimeError(f"could not read a frame of {path} at {t:.2f}s: {log[-500:]}")
+    times = _PTS_TIME_RE.findall(log)
+    return np.frombuffer(proc.stdout, dtype=np.uint8).reshape(h, w, 3), float(times[0]) if times else t
+
+
+def _timestamp(seconds):
+    return f"{int(seconds // 60)}:{seconds % 60:04.1f}"
+
+
+def contact_sheet(path, sheet_path, frames=SHEET_FRAMES, columns=SHEET_COLUMNS, width=THUMB_WIDTH, info=None):
+    """
+    Tiles `frames` frames of `path`, spread evenly over its duration, into
+    one JPEG with each frame's time stamped on it. Each target takes the
+    keyframe before it, so nothing else is decoded; only when keyframes are
+    sparser than the targets (one already used) is the exact frame decoded.
+    Returns the number of tiles.
+    """
+    info = info or probe(path)
+    w = width // 2 * 2
+    h = max(2, round(w * info["height"] / info["width"] / 2) * 2)
+    duration = info["duration"]
+
+    thumbs, seen = [], set()
+    for i in range(frames):
+        target = (i + 0.5) * duration / frames
+        frame, t = keyframe_thumbnail(path, target, (w, h))
+        if round(t, 3) in seen:
+            frame, t = keyframe_thumbnail(path, target, (w, h), exact=True)
+        seen.add(round(t, 3))
+        thumbs.append((frame, t))
+
+    columns = min(columns, len(thumbs))
+    rows = math.ceil(len(thumbs) / columns)
+    sheet = np.full((SHEET_HEADER + rows * (h + SHEET_GAP) + SHEET_GAP, columns * (w + SHEET_GAP) + SHEET_GAP, 3),
+                    24, dtype=np.uint8)
+    cv2.putText(sheet, f"{os.path.basename(path)}  {_timestamp(duration)}  {info['width']}x{info['height']}",
+                (SHEET_GAP, SHEET_HEADER - 9), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+    for i, (frame, t) in enumerate(thumbs):
+        x = SHEET_GAP + (i % columns) * (w + SHEET_GAP)
+        y = SHEET_HEADER + (i // columns) * (h + SHEET_GAP)
+        sheet[y:y + h, x:x + w] = frame
+        label = _timestamp(t)
+        cv2.putText(sheet, label, (x + 5, y + h - 7), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 3, cv2.LINE_AA)
+        cv2.putText(sheet, label, (x + 5, y + h - 7), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1, cv2.LINE_AA)
+
+    os.makedirs(os.path.dirname(os.path.abspath(sheet_path)), exist_ok=True)
+    if not cv2.imwrite(sheet_path, cv2.cvtColor(sheet, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, SHEET_QUALITY]):
+        raise RuntimeError(f"could not write {sheet_path}")
+    return len(thumbs)
+
+
+def make_sheets(paths, sheet_folder, frames=SHEET_FRAMES, columns=SHEET_COLUMNS, width=THUMB_WIDTH,
+                workers=SHEET_WORKERS, infos=None):
+    """
+    One contact sheet per video in `paths`, named after it, in
+    `sheet_folder`. Sheets newer than their video are kept. `infos` are
+    the videos' probe results if already known (e.g. from the media
+    index). Returns {video path: sheet path or None if it failed}.
+    """
+    infos = infos or [None] * len(paths)
+
+    def sheet(path, info):
+        sheet_path = os.path.join(sheet_folder, os.path.splitext(os.path.basename(path))[0] + ".jpg")
+        if os.path.exists(sheet_path) and os.path.getmtime(sheet_path) >= os.path.getmtime(path):
+            return sheet_path
+        start = time.perf_counter()
+        try:
+            tiles = contact_sheet(path, sheet_path, frames, columns, width, info)
+        except Exception as e:  # one broken output must not stop the others
+            emit("sheet_failed", f"❌ Contact sheet failed: {os.path.basename(path)}: {e}",
+                 video=os.path.basename(path), error=str(e)[-500:])
+            return None
+        emit("sheet", f"🖼️ {os.path.basename(sheet_path)}: {tiles} frames", video=os.path.basename(path),
+             sheet=sheet_path, tiles=tiles, seconds=round(time.perf_counter() - start, 3))
+        return sheet_path
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(paths, pool.map(sheet, paths, infos)))
+
+
+def folder_sheets(folder, **kwargs):
+    """
+    Contact sheets for every .mp4 in `folder`, in its SHEET_DIR_NAME subfolder.
+    """
+    if not os.path.isdir(folder):
+        return {}
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.lower().endswith(".mp4"))
+    return make_sheets(paths, os.path.join(folder, SHEET_DIR_NAME), **kwargs)
@@ -0,0 +1,440 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pipeline.batch import _crashed, _run_job, plan_workers, print_summary
+from pipeline.builds import BuildCache, natural_key, seeded_choice
+from pipeline.concat import PATH_COPY, PATH_DEMUX_PAD, assemble_ffmpeg, long_fps
+from pipeline.download import STATUS_DONE
+from pipeline.encoders import get_profile
+from pipeline.ffmpeg import probe
+from pipeline.render import MUSIC_EXTS, VIDEO_EXTS, _readable, durations, list_media, render_group, video_jobs
+from pipeline.telemetry import emit
+
+# --- Streaming pipeline ---
+DISK_BUDGET_MB = 4096         # downloaded sources waiting for (or in) a render
+PARTS_DIR_NAME = ".assembly"  # next to the long video: one 1920x1080 part per short, reused across runs
+
+
+class DiskBudget:
+    """
+    Byte budget for intermediate files, shared by the pipeline's threads.
+
+    A download `reserve`s its expected size before it starts (the mean of
+    the downloads so far; until one has finished, only one runs) and
+    blocks while that doesn't fit. `commit` swaps the reservation for the
+    real size, `release` frees it once the file is no longer needed.
+    Nothing blocks while nothing is held, so one file bigger than the
+    whole budget still gets through.
+    """
+
+    def __init__(self, limit_bytes):
+        self.limit = limit_bytes
+        self.used = 0
+        self.peak = 0
+        self.waits = 0
+        self._sizes = []
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _estimate(self):
+        return sum(self._sizes) // len(self._sizes) if self._sizes else self.limit
+
+    def reserve(self):
+        """
+        Blocks until a download of the expected size fits; returns the bytes reserved.
+        """
+        with self._cond:
+            if self.used > 0 and self.used + self._estimate() > self.limit and not self._closed:
+                self.waits += 1
+                emit("backpressure", f"⏸️ Download waiting for disk budget ({self.used / 2**20:.1f} of {self.limit / 2**20:.0f} MB held)",
+                     used=self.used, limit=self.limit)
+            while self.used > 0 and self.used + self._estimate() > self.limit and not self._closed:
+                self._cond.wait()
+            reserved = self._estimate()
+            self.used += reserved
+            return reserved
+
+    def commit(self, reserved, size):
+        with self._cond:
+            if size:
+                self._sizes.append(size)
+            self.used += size - reserved
+            self.peak = max(self.peak, self.used)
+            self._cond.notify_all()
+
+    def release(self, size):
+        with self._cond:
+            self.used -= size
+            self._cond.notify_all()
+
+    def close(self):
+        # Lets every waiting thread go (the run is over or failed)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class LongBuilder:
+    """
+    Builds the long video while the shorts are still being rendered.
+
+    Every short handed to `add` is scaled and padded to 1920x1080 and
+    encoded into its own part on a background thread straight away;
+    `finish` joins the parts, in short order, by stream copy with the
+    music. Parts are named by the short's content hash and the settings
+    and kept in PARTS_DIR_NAME next to the long video, so a rerun only
+    re-encodes the shorts that changed. Size-targeted profiles ("size")
+    can't be honoured, since the total duration isn't known up front;
+    their parts use the profile's other settings.
+
+    Without a fixed `fps` the long video runs at its first short's frame
+    rate, as in 3_final.py. Parts are encoded at the rate of the first
+    short added; if the first short in the final order differs, `finish`
+    re-encodes them at its rate.
+    """
+
+    def __init__(self, output_path, cache, encoder=None, fps=None, workers=1, threads=None):
+        self.output_path = output_path
+        self.cache = cache
+        self.fps = fps
+        self._fixed_fps = fps is not None
+        self.threads = threads
+        self.profile = dict(get_profile(encoder))
+        self.profile.pop("target_mb", None)
+        self.profile.pop("auto", None)
+        self.dir = os.path.join(os.path.dirname(os.path.abspath(output_path)), PARTS_DIR_NAME)
+        self.parts = {}  # short path -> future of its part path
+        self.encoded = 0
+        self.span = None  # [first start, last end] of the builder's work (perf_counter)
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+
+    def add(self, short_path):
+        """
+        Queues one finished short (again after it was re-rendered).
+        """
+        stem = os.path.splitext(os.path.basename(short_path))[0]
+        if self.fps is None:
+            try:
+                self.fps = long_fps([probe(short_path)])
+            except Exception:  # unreadable; its part fails and is reported in finish
+                pass
+        key = self.cache.part_key(short_path, fps=self.fps, profile=self.profile)
+        part = os.path.join(self.dir, f"{stem}.{key}.mp4")
+        self.parts[short_path] = self._pool.submit(self._encode, short_path, part)
+
+    def _busy(self, start):
+        end = time.perf_counter()
+        self.span = [min(self.span[0], start), end] if self.span else [start, end]
+
+    def _encode(self, short_path, part):
+        # Runs on the builder's thread; a part that exists is already up to date
+        if os.path.exists(part):
+            return part
+        os.makedirs(self.dir, exist_ok=True)
+        start = time.perf_counter()
+        tmp_path = f"{part}.tmp.mp4"
+        try:
+            assemble_ffmpeg([short_path], None, tmp_path, path=PATH_DEMUX_PAD, encoder=self.profile,
+                            threads=self.threads, fps=self.fps)
+            os.replace(tmp_path, part)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.encoded += 1
+        self._busy(start)
+        emit("part_encoded", f"🧩 Long video part ready: {os.path.basename(short_path)}",
+             short=os.path.basename(short_path), seconds=round(time.perf_counter() - start, 3))
+        return part
+
+    def _collect(self, shorts):
+        # Waits for the parts of `shorts`; a short whose part failed is reported and left out
+        done = []
+        for short in shorts:
+            try:
+                done.append((short, self.parts[short].result()))
+            except Exception as e:
+                emit("part_failed", f"❌ Long video part failed, leaving it out: {os.path.basename(short)}: {e}",
+                     short=os.path.basename(short), error=str(e)[-500:])
+        return done
+
+    def finish(self, shorts, music_path):
+        """
+        Joins the parts of `shorts` (all must have been added) into the long
+        video, unless it's already up to date. Shorts whose part could not
+        be encoded (e.g. a corrupt file) are left out. Returns True if it
+        was written.
+        """
+        done = self._collect(shorts)
+        if done and not self._fixed_fps:
+            fps = long_fps([probe(done[0][0])])
+            if fps != self.fps:
+                self.fps = fps
+                for short, _ in done:
+                    self.add(short)
+                done = self._collect([short for short, _ in done])
+        if not done:
+            emit("final_skipped", f"⚠️ No short could be added to the long video: {self.output_path}")
+            return False
+        shorts, parts = [short for short, _ in done], [part for _, part in done]
+        start = time.perf_counter()
+        state = self.cache.shorts_state(shorts)
+        final_key = self.cache.final_key(state, music_path, method="stream", fps=self.fps, encoder=self.profile)
+        if self.cache.is_current(self.output_path, final_key):
+            emit("final_up_to_date", f"⏭️ Final long video is up to date: {self.output_path}")
+            return False
+        assemble_ffmpeg(parts, music_path, self.output_path, path=PATH_COPY, infos=[probe(p) for p in parts],
+                        encoder=self.profile)
+        self.cache.record(self.output_path, final_key, shorts=state)
+        self._busy(start)
+
+        # Parts of shorts that are gone or were re-rendered since
+        keep = {os.path.basename(p) for p in parts}
+        for name in os.listdir(self.dir):
+            if name not in keep:
+                os.remove(os.path.join(self.dir, name))
+        return True
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _isolated(item, threads):
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(_run_job, render_group, item, threads).result()
+        except BrokenProcessPool:
+            return _crashed(item, "worker process crashed")
+
+
+class StreamingPipeline:
+    """
+    Download, render and assembly as one run, linked by work queues, so the
+    batch takes about as long as its slowest stage instead of the sum.
+
+    Download threads hand every finished source to the render pool right
+    away; every rendered short goes to a LongBuilder that encodes its part
+    of the long video while the other shorts still render. Backpressure:
+    at most `workers` renders are in flight, sources wait in a queue, and
+    new downloads only start while the sources waiting for (or in) a
+    render fit `disk_budget_mb`. Without `keep_downloads` each source is
+    deleted once its shorts are rendered (a rerun downloads it again).
+
+    Settings mirror the stage scripts: a BuildCache (`cache`) skips shorts
+    that are up to date, a MediaIndex (`index`) skips unreadable files
+    and an AssignmentPlan (`assignments`) pairs reactions and music by
+    duration.
+    """
+
+    def __init__(self, downloader, reaction_folder, music_folder, output_folder, final_output, layouts,
+                 encoder=None, key=None, final_encoder=None, workers=None, threads=None,
+                 disk_budget_mb=DISK_BUDGET_MB, keep_downloads=True, cache=None, index=None,
+                 assignments=None):
+        self.downloader = downloader
+        self.reaction_folder = reaction_folder
+        self.music_folder = music_folder
+        self.output_folder = output_folder
+        self.final_output = final_output
+        self.layouts = layouts
+        self.encoder = encoder
+        self.key = key
+        self.final_encoder = final_encoder
+        self.workers = workers
+        self.threads = threads
+        self.budget = DiskBudget(disk_budget_mb * 1024 * 1024)
+        self.keep_downloads = keep_downloads
+        self.cache = cache
+        self.index = index
+        self.assignments = assignments
+        self._durations = None  # (reactions, music) file name -> duration, for the assignment plan
+        self.stages = {}  # stage -> [first start, last end] (perf_counter)
+
+    def _stage(self, name, start, end):
+        span = self.stages.setdefault(name, [start, end])
+        span[0], span[1] = min(span[0], start), max(span[1], end)
+
+    def _download(self, i, url, events):
+        # Download thread: waits for disk budget, then hands the file to the coordinator
+        reserved = self.budget.reserve()
+        start = time.perf_counter()
+        size = 0
+        try:
+            entry = self.downloader.download(url, f"video_{i}")
+            size = (entry.get("size") or 0) if entry.get("status") == STATUS_DONE else 0
+        finally:
+            self.budget.commit(reserved, size)
+        events.put(("downloaded", (i, url, entry, size, start, time.perf_counter())))
+
+    def run(self, urls):
+        """
+        Runs the whole pipeline for `urls` (new ones named video_1, video_2,
+        ... by position, as in 1_file_download.py). Returns a report with the
+        download entries, render results, per-stage spans and wall time,
+        or None (after printing why) when reactions or music are missing.
+        """
+        reaction_files = sorted(list_media(self.reaction_folder, VIDEO_EXTS))
+        music_files = sorted(list_media(self.music_folder, MUSIC_EXTS))
+        if self.index is not None:
+            reaction_files = _readable(self.index, self.reaction_folder, reaction_files, "reaction")
+            music_files = _readable(self.index, self.music_folder, music_files, "music")
+        if not reaction_files:
+            emit("no_input", f"⚠️ No reaction videos found in {self.reaction_folder}", kind="reaction",
+                 folder=self.reaction_folder)
+            return None
+        if not music_files:
+            emit("no_input", f"⚠️ No music files found in {self.music_folder}", kind="music", folder=self.music_folder)
+            return None
+        if self.assignments is not None:
+            self._durations = (durations(self.index, self.reaction_folder, reaction_files),
+                               durations(self.index, self.music_folder, music_files))
+
+        # A URL listed twice is downloaded and rendered once, under its first row's name
+        rows = {}
+        for i, url in enumerate(urls, start=1):
+            rows.setdefault(url, i)
+        if len(rows) < len(urls):
+            emit("duplicate_urls", f"⚠️ Skipping {len(urls) - len(rows)} repeated URLs",
+                 duplicates=len(urls) - len(rows))
+
+        workers, threads = plan_workers(len(rows), self.workers, self.threads)
+        emit("stream_start", f"🚰 Streaming {len(rows)} URLs: {self.downloader.concurrency} downloads, "
+             f"{workers} render workers x {threads} ffmpeg threads, {self.budget.limit / 2**20:.0f} MB disk budget",
+             urls=len(rows), workers=workers, threads=threads, budget=self.budget.limit)
+        os.makedirs(self.downloader.output_folder, exist_ok=True)
+        os.makedirs(self.output_folder, exist_ok=True)
+
+        builder = LongBuilder(self.final_output, self.cache or BuildCache(self.output_folder), self.final_encoder,
+                              threads=threads)
+        events = queue.Queue()
+        downloads, results = {}, []
+        waiting = deque()  # batch items whose source is on disk, waiting for a render slot
+        in_flight = {}     # future -> (item, source, size, start)
+        start = time.perf_counter()
+        download_pool = ThreadPoolExecutor(max_workers=self.downloader.concurrency)
+        render_pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            for url, i in rows.items():
+                download_pool.submit(self._download, i, url, events).add_done_callback(
+                    lambda f: f.exception() is not None and events.put(("error", f.exception()))
+                )
+
+            while len(downloads) < len(rows) or waiting or in_flight:
+                while waiting and len(in_flight) < workers:
+                    item, source, size = waiting.popleft()
+                    future = render_pool.submit(_run_job, render_group, item, threads)
+                    in_flight[future] = (item, source, size, time.perf_counter(), render_pool)
+                    future.add_done_callback(lambda f: events.put(("rendered", f)))
+
+                kind, payload = events.get()
+                if kind == "error":
+                    raise payload
+                if kind == "downloaded":
+                    i, url, entry, size, t0, t1 = payload
+                    downloads[url] = entry
+                    self._stage("download", t0, t1)
+                    item = self._plan(url, entry, size, reaction_files, music_files, builder)
+                    if item is not None:
+                        waiting.append((item, entry["file"], size))
+                    continue
+
+                item, source, size, t0, pool = in_flight.pop(payload)
+                try:
+                    result = payload.result()
+                except BrokenProcessPool:
+                    # A worker died hard and took the pool (and every render in it) down. New
+                    # renders go to a fresh pool; each affected one reruns on its own, so only
+                    # the real culprit fails (as in pipeline.batch.run_batch).
+                    if pool is render_pool:
+                        render_pool = ProcessPoolExecutor(max_workers=workers)
+                    result = _isolated(item, threads)
+                self._stage("render", t0, time.perf_counter())
+                self._rendered(item, result, source, size, builder)
+                results.append(result)
+
+            video_files = sorted(list_media(self.output_folder, VIDEO_EXTS), key=natural_key)
+            shorts = [os.path.join(self.output_folder, f) for f in video_files]
+            for short in shorts:
+                # Shorts from earlier runs that no URL of this run produced, as 3_final.py would include them
+                if short not in builder.parts:
+                    builder.add(short)
+            if shorts:
+                music_file = seeded_choice(music_files, "final", os.path.basename(self.final_output))
+                builder.finish(shorts, os.path.join(self.music_folder, music_file))
+            if builder.span:
+                self._stage("assemble", *builder.span)
+        finally:
+            self.budget.close()
+            download_pool.shutdown(wait=True, cancel_futures=True)
+            render_pool.shutdown(wait=True, cancel_futures=True)
+            builder.close()
+            self.downloader.close()
+
+        wall = time.perf_counter() - start
+        if results:
+            print_summary(results, wall=wall)
+        stages = {name: round(end - begin, 3) for name, (begin, end) in self.stages.items()}
+        emit("stream_done", f"🏁 Pipeline finished in {wall:.1f}s (stage spans: "
+             f"{', '.join(f'{name} {seconds:.1f}s' for name, seconds in stages.items())})",
+             wall=round(wall, 3), stages=stages, parts=builder.encoded, peak_disk=self.budget.peak,
+             budget_waits=self.budget.waits)
+        return {"downloads": downloads, "renders": results, "stages": stages, "wall": wall,
+                "parts_encoded": builder.encoded, "peak_disk": self.budget.peak, "budget_waits": self.budget.waits}
+
+    def _plan(self, url, entry, size, reaction_files, music_files, builder):
+        # Coordinator: turns a finished download into a batch item, or settles it right away
+        if entry.get("status") != STATUS_DONE:
+            emit("download_failed", f"❌ Download failed: {url}: {entry.get('error')}", url=url,
+                 error=entry.get("error"))
+            return None
+        source = entry["file"]
+        video_file = os.path.basename(source)
+        if self.index is not None and not _readable(self.index, os.path.dirname(source), [video_file], "video"):
+            self._done_with(source, size)
+            return None
+
+        pair = None
+        if self.assignments is not None:
+            video_duration = durations(self.index, os.path.dirname(source), [video_file])[video_file]
+            pair = self.assignments.assign(video_file, video_duration, *self._durations)
+            self.assignments.save()
+        jobs = video_jobs(source, self.reaction_folder, reaction_files, self.music_folder, music_files,
+                          self.output_folder, self.layouts, self.encoder, self.key, pair=pair)
+        todo = jobs
+        if self.cache is not None:
+            for job in jobs:
+                self.cache.adopt(job["output"], source)
+                job["build_key"] = self.cache.job_key(job)
+            todo = [job for job in jobs if not self.cache.is_current(job["output"], job["build_key"])]
+        for job in jobs:
+            if job not in todo:
+                builder.add(job["output"])
+        if not todo:
+            emit("up_to_date", f"⏭️ Up to date: {video_file}", video=video_file)
+            self._done_with(source, size)
+            return None
+        emit("queued", f"🎬 Queued: {video_file} ({', '.join(job['layout'] for job in todo)})",
+             video=video_file, layouts=[job["layout"] for job in todo])
+        return {"name": video_file, "kwargs": {"jobs": todo}}
+
+    def _rendered(self, item, result, source, size, builder):
+        emit(
+            "job_done" if result["ok"] else "job_failed",
+            f"{'✅ Saved' if result['ok'] else '❌ Failed'}: {result['name']}",
+            job=result["name"], wall=round(result["wall"], 3), frames=result["frames"], fps=round(result["fps"], 2),
+        )
+        if result["ok"]:
+            for job in item["kwargs"]["jobs"]:
+                if self.cache is not None:
+                    self.cache.record(job["output"], job["build_key"], source=os.path.basename(job["source"]))
+                builder.add(job["output"])
+        self._done_with(source, size)
+
+    def _done_with(self, source, size):
+        # The source has been rendered (or skipped): it no longer counts against the budget
+        if not self.keep_downloads and os.path.exists(source):
+            os.remove(source)
+        self.budget.release(size)
@@ -0,0 +1,213 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# --- Settings travel in environment variables so process-pool workers inherit them ---
+ENV_EVENTS = "RENDER_EVENTS"      # JSON-lines event log path
+ENV_TIMINGS = "RENDER_TIMINGS"    # "1" = time every frame per layer and stage
+ENV_FRAMES = "RENDER_FRAME_EVENTS"  # "1" = also log one event per frame
+ENV_PROFILE = "RENDER_PROFILE"    # folder for per-job cProfile dumps (.prof)
+
+PROGRESS_EVERY = 5.0  # seconds between progress events while rendering
+
+_write_lock = threading.Lock()
+
+
+def configure(events=None, timings=False, frame_events=False, profile_dir=None):
+    """
+    Turns telemetry on for this process and every worker it starts.
+    events       -- path of the JSON-lines event log (appended to)
+    timings      -- instrument the render loop per layer and stage
+    frame_events -- with timings, log every frame's stage times too
+    profile_dir  -- write a cProfile dump per job (pstats format, e.g. for snakeviz)
+    """
+    settings = {
+        ENV_EVENTS: os.path.abspath(events) if events else None,
+        ENV_TIMINGS: "1" if timings or frame_events else None,
+        ENV_FRAMES: "1" if frame_events else None,
+        ENV_PROFILE: os.path.abspath(profile_dir) if profile_dir else None,
+    }
+    for name, value in settings.items():
+        if value:
+            os.environ[name] = value
+        else:
+            os.environ.pop(name, None)
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+
+def timings_enabled():
+    return os.environ.get(ENV_TIMINGS) == "1"
+
+
+def emit(event, message=None, **fields):
+    """
+    Records one event: `message` (the human-readable line) goes to stdout,
+    and the event with its fields goes to the JSON-lines log if configured.
+    """
+    if message is not None:
+        sys.stdout.write(message + "\n")  # one write, so lines from threads don't interleave
+    path = os.environ.get(ENV_EVENTS)
+    if not path:
+        return
+    record = {"ts": round(time.time(), 3), "event": event, "pid": os.getpid()}
+    record.update(fields)
+    line = json.dumps(record, default=str) + "\n"
+    # One write per line in append mode, so workers can share the file
+    with _write_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+class StageTimer:
+    """
+    Exclusive (self) time per named stage. Wrapped callables can nest (a
+    layer's frame function calls its source's); time spent in an inner
+    stage is only counted there, so the stages add up to the wall time.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.peaks = defaultdict(float)
+        self.gauges = {}
+        self.frames = 0    # set by the render loop for the summary
+        self.outputs = {}  # per-output encoder throughput, ditto
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def wrap(self, name, fn):
+        def timed(*args, **kwargs):
+            stack = self._stack()
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                own = elapsed - stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self.totals[name] += own
+                self.counts[name] += 1
+                if own > self.peaks[name]:
+                    self.peaks[name] = own
+        return timed
+
+    def gauge(self, name, value):
+        # Last value and peak of something sampled, e.g. a queue depth
+        last, peak = self.gauges.get(name, (0, 0))
+        self.gauges[name] = (value, max(peak, value))
+
+    def snapshot(self):
+        return dict(self.totals)
+
+    def summary(self, frames):
+        stages = {}
+        for name in sorted(self.totals, key=self.totals.get, reverse=True):
+            total = self.totals[name]
+            stages[name] = {
+                "seconds": round(total, 4),
+                "calls": self.counts[name],
+                "ms_per_frame": round(1000 * total / frames, 3) if frames else None,
+                "max_ms": round(1000 * self.peaks[name], 3),
+            }
+        return {
+            "stages": stages,
+            "gauges": {name: {"last": v[0], "peak": v[1]} for name, v in self.gauges.items()},
+        }
+
+
+def instrument(clip, name, timer):
+    """
+    Times `clip`'s own frame function (and its mask's) under `name`, in place.
+    Works on any MoviePy clip because get_frame looks make_frame up per call.
+    """
+    if timer is None:
+        return clip
+    clip.make_frame = timer.wrap(name, clip.make_frame)
+    if getattr(clip, "mask", None) is not None:
+        clip.mask.make_frame = timer.wrap(name + ".mask", clip.mask.make_frame)
+    return clip
+
+
+class Progress:
+    """
+    Emits a progress event (frames, fps, current gauges) every
+    PROGRESS_EVERY seconds, plus one event per frame if asked to.
+    """
+
+    def __init__(self, job, total_frames, timer=None):
+        self.job = job
+        self.total = total_frames
+        self.timer = timer
+        self.frames = 0
+        self.start = self._last = time.perf_counter()
+        self._frame_events = os.environ.get(ENV_FRAMES) == "1" and timer is not None
+        self._prev = timer.snapshot() if self._frame_events else None
+
+    def frame(self, t):
+        self.frames += 1
+        now = time.perf_counter()
+        if self._frame_events:
+            current = self.timer.snapshot()
+            stage_ms = {k: round(1000 * (v - self._prev.get(k, 0.0)), 3) for k, v in current.items()
+                        if v != self._prev.get(k, 0.0)}
+            self._prev = current
+            emit("frame", job=self.job, index=self.frames - 1, t=round(float(t), 4), stage_ms=stage_ms)
+        if now - self._last >= PROGRESS_EVERY:
+            self._last = now
+            elapsed = now - self.start
+            emit("progress", job=self.job, frames=self.frames, total=self.total,
+                 fps=round(self.frames / elapsed, 2), elapsed=round(elapsed, 2),
+                 gauges={k: v[0] for k, v in self.timer.gauges.items()} if self.timer else {})
+
+
+@contextmanager
+def job_telemetry(name):
+    """
+    Wraps one render job: yields a StageTimer (None unless timings are on),
+    dumps a cProfile file if configured, and emits the end-of-job summary.
+    The job sets `timer.frames` / `timer.outputs` for the summary.
+    """
+    timer = StageTimer() if timings_enabled() else None
+    profile_dir = os.environ.get(ENV_PROFILE)
+    profiler = cProfile.Profile() if profile_dir else None
+    emit("job_start", job=name)
+    start = time.perf_counter()
+    ok = False
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield timer
+        ok = True
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in os.path.basename(name))
+            profiler.dump_stats(os.path.join(profile_dir, f"{safe}.{os.getpid()}.prof"))
+        wall = time.perf_counter() - start
+        if timer is not None:
+            frames = timer.frames
+            summary = timer.summary(frames)
+            emit("job_summary", job=name, ok=ok, wall=round(wall, 3), frames=frames,
+                 fps=round(frames / wall, 2) if wall > 0 else 0.0,
+                 outputs=timer.outputs, **summary)
+            if ok:
+                print_stage_summary(name, wall, frames, summary)
+
+
+def print_stage_summary(name, wall, frames, summary):
+    print(f"⏱️ {os.path.basename(name)}: {frames} frames in {wall:.1f}s")
+    for stage, s in summary["stages"].items():
+        share = 100 * s["seconds"] / wall if wall > 0 else 0.0
+        print(f"  {stage:<32} {s['seconds']:8.2f}s {share:5.1f}%  {s['ms_per_frame'] or 0:7.2f} ms/frame")
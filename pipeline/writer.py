@@ -0,0 +1,210 @@
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+
+from pipeline.audio import AUDIO_FPS, CHANNELS
+from pipeline.encoders import audio_args, encoder_args
+from pipeline.ffmpeg import ffmpeg_binary
+
+# --- Pipe writer ---
+QUEUE_FRAMES = 8  # frames in flight between the render loop and each ffmpeg process
+_DONE = None      # end-of-stream marker on the frame queue
+
+
+def _blocks(audio):
+    return [audio] if isinstance(audio, np.ndarray) else audio
+
+
+class PipeWriter:
+    """
+    Encodes frames, and optionally a soundtrack, with one ffmpeg process
+    fed straight through pipes.
+
+    `write` copies each frame into one of a fixed ring of QUEUE_FRAMES
+    buffers and queues it; a writer thread hands the buffers to ffmpeg's
+    stdin as raw bytes (no tobytes() copy) and returns them to the ring.
+    When every buffer is in flight `write` blocks, so a slow encoder holds
+    the render loop back instead of letting frames pile up in memory.
+
+    `audio` is float32 PCM (see pipeline.audio), one array or an iterable
+    of blocks. Another thread streams it to ffmpeg on a second pipe and it
+    is encoded in the same process, so no audio temp file is written.
+    (Windows can't hand ffmpeg an extra pipe; there the PCM goes through a
+    temp file, which is always removed.)
+
+    Use it as a context manager: a clean exit finishes the file, an
+    exception kills ffmpeg and deletes the partial output.
+    """
+
+    def __init__(self, output, size, fps, profile, audio=None, threads=None, queue_frames=QUEUE_FRAMES,
+                 timer=None, name=None):
+        self.output = output
+        self.size = size
+        self.timer = timer
+        self.name = name or os.path.basename(output)
+        self.frames = 0
+        self.error = None
+        self._temp = []
+        self._threads = []
+        self._stderr = []
+        self._finished = False
+
+        w, h = size
+        self._free = queue.Queue()
+        for _ in range(queue_frames):
+            self._free.put(np.empty((h, w, 3), dtype=np.uint8))
+        self._queue = queue.Queue(maxsize=queue_frames + 1)  # room for the end marker
+
+        cmd = [ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "rawvideo", "-vcodec", "rawvideo", "-s", f"{w}x{h}", "-pix_fmt", "rgb24",
+               "-r", str(fps), "-i", "-"]
+        audio_fd = None
+        pass_fds = ()
+        try:
+            if audio is not None:
+                cmd += ["-f", "f32le", "-ar", str(AUDIO_FPS), "-ac", str(CHANNELS)]
+                if os.name == "posix":
+                    read_fd, audio_fd = os.pipe()
+                    pass_fds = (read_fd,)
+                    cmd += ["-i", f"pipe:{read_fd}"]
+                else:
+                    fd, path = tempfile.mkstemp(prefix="render_audio_", suffix=".f32")
+                    self._temp.append(path)
+                    with os.fdopen(fd, "wb") as f:
+                        for block in _blocks(audio):
+                            f.write(np.ascontiguousarray(block, dtype=np.float32).data)
+                    cmd += ["-i", path]
+                cmd += ["-map", "0:v:0", "-map", "1:a:0"] + audio_args(profile)
+            cmd += encoder_args(profile)
+            if threads:
+                cmd += ["-threads", str(threads)]
+            cmd.append(output)
+
+            self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                          stderr=subprocess.PIPE, pass_fds=pass_fds)
+        except BaseException:
+            if audio_fd is not None:
+                os.close(audio_fd)
+            self._remove_temp()
+            raise
+        finally:
+            for fd in pass_fds:
+                os.close(fd)
+
+        self._stderr_thread = self._start(self._drain_stderr)
+        self._video_thread = self._start(self._write_video)
+        if audio_fd is not None:
+            self._start(self._write_audio, audio_fd, audio)
+
+    def _start(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+
+    def _drain_stderr(self):
+        # A chatty ffmpeg must never block on a full stderr pipe
+        self._stderr.append(self._proc.stderr.read())
+
+    def _write_video(self):
+        # Writer thread; after an error it keeps recycling buffers so write() never blocks for good
+        stdin = self._proc.stdin
+        while True:
+            frame = self._queue.get()
+            if frame is _DONE:
+                break
+            if self.error is None:
+                try:
+                    stdin.write(memoryview(frame))
+                except OSError as e:
+                    self.error = e
+            self._free.put(frame)
+
+    def _write_audio(self, fd, audio):
+        try:
+            with os.fdopen(fd, "wb") as pipe:
+                for block in _blocks(audio):
+                    pipe.write(np.ascontiguousarray(block, dtype=np.float32).data)
+        except OSError as e:
+            # ffmpeg went away; close() reports why
+            if self.error is None:
+                self.error = e
+
+    def _stderr_tail(self):
+        return b"".join(self._stderr).decode("utf-8", "replace")[-2000:]
+
+    def _remove_temp(self):
+        for path in self._temp:
+            if os.path.exists(path):
+                os.remove(path)
+        self._temp = []
+
+    def write(self, frame):
+        """
+        Queues one RGB frame (any array of the output size); the caller may reuse `frame` right away.
+        """
+        if self.error is not None:
+            # The pipe broke because ffmpeg exited; its error output says why
+            self._stderr_thread.join(timeout=5)
+            raise RuntimeError(f"ffmpeg stopped taking frames for {self.output} ({self.error}):\n{self._stderr_tail()}")
+        buffer = self._free.get()
+        np.copyto(buffer, frame, casting="unsafe")
+        self._queue.put(buffer)
+        self.frames += 1
+        if self.timer is not None:
+            self.timer.gauge(f"queue.{self.name}", self._queue.qsize())
+
+    def close(self):
+        """
+        Flushes the queued frames and finishes the file. Raises with the tail
+        of ffmpeg's error output if encoding failed.
+        """
+        if self._finished:
+            return
+        self._finished = True
+        self._queue.put(_DONE)
+        self._video_thread.join()
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        returncode = self._proc.wait()
+        for thread in self._threads:
+            thread.join()
+        self._remove_temp()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed ({returncode}) writing {self.output}:\n{self._stderr_tail()}")
+
+    def abort(self):
+        """
+        Stops ffmpeg and deletes the partial output and any temp file.
+        """
+        if self._finished:
+            return
+        self._finished = True
+        self._proc.kill()
+        self._queue.put(_DONE)
+        for thread in self._threads:
+            thread.join()
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        self._proc.wait()
+        self._remove_temp()
+        if os.path.exists(self.output):
+            os.remove(self.output)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
@@ -0,0 +1,28 @@
+import os
+
+from pipeline.assets import ensure_keyed_asset
+
+# --- Reaction clips (green background) ---
+reaction_videos_folder = r"C:\Users\User\vinoth\myproject\reaction"
+
+# --- Key settings (must match the render script, they are part of the asset key) ---
+REACTION_WIDTH = 400
+KEY_FEATHER = 0
+KEY_SPILL = 0.0
+
+if __name__ == "__main__":
+    reaction_files = [f for f in os.listdir(reaction_videos_folder) if f.lower().endswith((".mp4", ".mov", ".avi", ".mkv"))]
+    if not reaction_files:
+        print("⚠️ No reaction videos found in", reaction_videos_folder)
+        exit()
+
+    for reaction_file in reaction_files:
+        asset = ensure_keyed_asset(
+            os.path.join(reaction_videos_folder, reaction_file),
+            width=REACTION_WIDTH,
+            feather=KEY_FEATHER,
+            spill=KEY_SPILL,
+        )
+        print(f"✅ {reaction_file}: {asset.meta['frames']} keyed frames at {asset.meta['w']}x{asset.meta['h']}")
+
+    print("🎉 All reaction clips pre-keyed!")
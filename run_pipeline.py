@@ -0,0 +1,77 @@
+import os
+
+import pandas as pd
+
+from pipeline.assignment import AssignmentPlan
+from pipeline.builds import BuildCache
+from pipeline.download import Downloader
+from pipeline.media_index import MediaIndex
+from pipeline.stream import StreamingPipeline
+from pipeline.telemetry import configure, emit
+
+# Download -> render -> long video in one run: each finished download is rendered right
+# away and each finished short is added to the long video, instead of running
+# 1_file_download.py, 2_reaction.py and 3_final.py one after the other.
+
+# --- Inputs / outputs (same as the stage scripts) ---
+excel_file = r"C:\Users\User\vinoth\myproject\urls.xlsx"
+downloads_folder = r"C:\Users\User\vinoth\myproject\downloads"
+manifest_file = os.path.join(downloads_folder, "manifest.json")
+reaction_videos_folder = r"C:\Users\User\vinoth\myproject\reaction"
+background_music_folder = r"C:\Users\User\vinoth\myproject\background"
+output_folder = r"C:\Users\User\vinoth\myproject\output"
+final_output = r"C:\Users\User\vinoth\myproject\final_long_video.mp4"
+media_index_file = r"C:\Users\User\vinoth\myproject\media_index.sqlite"
+assignment_plan_file = r"C:\Users\User\vinoth\myproject\assignment_plan.json"
+
+# --- Stage settings ---
+CONCURRENCY = 4          # parallel downloads
+PER_HOST = 2             # max simultaneous downloads from one host
+RETRIES = 3              # retries per URL
+LAYOUTS = ["split"]
+ENCODER = "publish"      # shorts
+FINAL_ENCODER = "publish"  # long video parts
+BATCH_WORKERS = None     # parallel renders (None = size to the machine)
+FFMPEG_THREADS = None    # ffmpeg threads per render
+
+# --- Backpressure ---
+DISK_BUDGET_MB = 4096    # downloaded sources waiting to be rendered; downloads pause beyond this
+KEEP_DOWNLOADS = True    # False deletes each source once its shorts are rendered
+
+INCREMENTAL = True
+LENGTH_MATCHING = True   # pair reactions and music by duration (see 2_reaction.py)
+EVENTS_LOG = None        # e.g. "pipeline_events.jsonl"
+
+
+if __name__ == "__main__":
+    configure(events=EVENTS_LOG)
+    urls = pd.read_excel(excel_file).iloc[:, 0].dropna().tolist()
+    downloader = Downloader(
+        downloads_folder,
+        manifest_file,
+        concurrency=CONCURRENCY,
+        per_host=PER_HOST,
+        retries=RETRIES,
+        ydl_opts={"format": "mp4"},
+    )
+    with MediaIndex(media_index_file) as index:
+        pipeline = StreamingPipeline(
+            downloader,
+            reaction_videos_folder,
+            background_music_folder,
+            output_folder,
+            final_output,
+            LAYOUTS,
+            encoder=ENCODER,
+            final_encoder=FINAL_ENCODER,
+            workers=BATCH_WORKERS,
+            threads=FFMPEG_THREADS,
+            disk_budget_mb=DISK_BUDGET_MB,
+            keep_downloads=KEEP_DOWNLOADS,
+            cache=BuildCache(output_folder) if INCREMENTAL else None,
+            index=index,
+            assignments=AssignmentPlan(assignment_plan_file) if LENGTH_MATCHING else None,
+        )
+        report = pipeline.run(urls)
+    if report and all(r["ok"] for r in report["renders"]):
+        emit("all_done", f"🎉 Pipeline done: {final_output}")
@@ -1,54 +1,29 @@
-import cv2
-import numpy as np
-from rembg import remove
+from pipeline.matting import MattingPipeline, print_report
 
 # --- Input & Output ---
 input_video = r"C:\Users\User\vinoth\myproject\reaction\Video.mp4"
 output_video = r"C:\Users\User\vinoth\myproject\reaction\Video_green.mp4"
 
-# Open input video
-cap = cv2.VideoCapture(input_video)
-
-# Video info
-fps = int(cap.get(cv2.CAP_PROP_FPS))
-width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-# Video writer
-fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-out = cv2.VideoWriter(output_video, fourcc, fps, (width, height))
-
-# --- Background color (green) ---
-green_bg = np.array([0, 255, 0], dtype=np.uint8)  # BGR
-
-frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-print(f"🎬 Processing {frame_count} frames...")
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # Convert frame to RGBA with rembg (person isolated, transparent bg)
-    result = remove(frame)
-
-    # rembg returns RGBA, separate channels
-    if result.shape[2] == 4:
-        rgb, alpha = result[:, :, :3], result[:, :, 3]
-
-        # Create green background
-        bg = np.full_like(rgb, green_bg, dtype=np.uint8)
-
-        # Blend person + green background using alpha mask
-        alpha = alpha.astype(float) / 255.0
-        alpha = np.expand_dims(alpha, axis=2)
-
-        composite = (rgb * alpha + bg * (1 - alpha)).astype(np.uint8)
-    else:
-        composite = frame  # fallback
-
-    out.write(composite)
-
-cap.release()
-out.release()
-print(f"✅ Saved with green background: {output_video}")
+# Raw alpha track (uint8 per frame) saved next to the output so it can be reused
+alpha_track = r"C:\Users\User\vinoth\myproject\reaction\Video_green.alpha"
+
+# --- Pipeline settings ---
+WORKERS = 2          # inference workers, one rembg session each
+BATCH_SIZE = 4       # frames per inference batch
+INFER_SCALE = 0.5    # run segmentation at half resolution, upscale the mask
+QUALITY = "balanced" # full / high / balanced / fast: how often frames are fully segmented
+
+if __name__ == "__main__":
+    print(f"🎬 Processing {input_video} ...")
+    pipeline = MattingPipeline(
+        input_video,
+        output_video,
+        alpha_path=alpha_track,
+        workers=WORKERS,
+        batch_size=BATCH_SIZE,
+        infer_scale=INFER_SCALE,
+        quality=QUALITY,
+    )
+    report = pipeline.run()
+    print_report(report)
+    print(f"✅ Saved with green background: {output_video}")